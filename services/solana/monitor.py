@@ -10,16 +10,19 @@ import asyncio
 import json
 import traceback
 import aiohttp
+import orjson
 import websockets
 from config.settings import WSS_ENDPOINT, TARGET_WALLET, HTTP_ENDPOINT
 from utils.logger import logger
 
-# 黑名单：忽略 SOL, USDC, USDT
-IGNORE_MINTS = [
-    "So11111111111111111111111111111111111111112",  # WSOL
+WSOL_MINT = "So11111111111111111111111111111111111111112"
+
+# 黑名单：忽略 SOL, USDC, USDT（frozenset：每笔转账 O(1) 判断）
+IGNORE_MINTS = frozenset({
+    WSOL_MINT,  # WSOL
     "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v",  # USDC
     "Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB",  # USDT
-]
+})
 
 
 async def fetch_transaction_details(session, signature):
@@ -34,7 +37,7 @@ async def fetch_transaction_details(session, signature):
         try:
             async with session.post(HTTP_ENDPOINT, json=payload, timeout=10) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = orjson.loads(await response.read())
                     if data and len(data) > 0:
                         return data[0]
                     else:
@@ -69,10 +72,10 @@ def parse_tx(tx_data):
         "sol_spent": 0.0
     }
 
-    # 定义常量
-    WSOL_MINT = "So11111111111111111111111111111111111111112"
-    # 你的 IGNORE_MINTS 列表需要在外部定义或这里引用
-    # IGNORE_MINTS = [...]
+    # 循环内反复使用的全局变量绑定为局部变量
+    target_wallet = TARGET_WALLET
+    wsol_mint = WSOL_MINT
+    ignore_mints = IGNORE_MINTS
 
     out_tokens = []
     in_tokens = []
@@ -84,21 +87,21 @@ def parse_tx(tx_data):
         token_amount = tx.get('tokenAmount', 0)
 
         # 🛡️ 特殊处理 WSOL：计入成本，但不作为买卖目标
-        if mint == WSOL_MINT:
-            if tx['fromUserAccount'] == TARGET_WALLET:
+        if mint == wsol_mint:
+            if tx['fromUserAccount'] == target_wallet:
                 # Helius 的 tokenTransfers 通常已经是 Decimal 格式 (如 4.95)
                 # 不需要除以 1e9，直接累加
                 wsol_spent += float(token_amount)
             continue
 
         # 忽略黑名单代币 (USDC/USDT)
-        if mint in IGNORE_MINTS:
+        if mint in ignore_mints:
             continue
 
         # 统计目标代币
-        if tx['fromUserAccount'] == TARGET_WALLET:
+        if tx['fromUserAccount'] == target_wallet:
             out_tokens.append((mint, token_amount))
-        elif tx['toUserAccount'] == TARGET_WALLET:
+        elif tx['toUserAccount'] == target_wallet:
             in_tokens.append((mint, token_amount))
 
     # --- 2. 处理 Native SOL 转账 ---
@@ -107,9 +110,9 @@ def parse_tx(tx_data):
 
     for nt in native_transfers:
         amount = nt.get('amount', 0)  # 这是 lamports
-        if nt['fromUserAccount'] == TARGET_WALLET:
+        if nt['fromUserAccount'] == target_wallet:
             sol_balance_change -= amount
-        elif nt['toUserAccount'] == TARGET_WALLET:
+        elif nt['toUserAccount'] == target_wallet:
             sol_balance_change += amount
 
     # 只有当 SOL 净减少时，才计入花费
@@ -177,7 +180,7 @@ async def start_monitor(process_callback, pm):
                     try:
                         for _ in range(10):  # 最多检查10次，每次0.5秒
                             msg = await asyncio.wait_for(ws.recv(), timeout=0.5)
-                            data = json.loads(msg)
+                            data = orjson.loads(msg)
                             
                             # 记录所有收到的消息类型（用于调试）
                             msg_type = data.get("method", "response")
@@ -273,7 +276,7 @@ async def start_monitor(process_callback, pm):
                             # 如果连接断开，websockets库会自动抛出ConnectionClosed异常
                             # 如果连接正常但没消息，这里会一直等待（这是正常的）
                             msg = await ws.recv()
-                            data = json.loads(msg)
+                            data = orjson.loads(msg)
                             
                             # 更新最后收到消息的时间（仅应用层消息，ping/pong在底层处理）
                             current_time = asyncio.get_event_loop().time()
@@ -15,16 +15,18 @@ import argparse
 import asyncio
 import logging
 import os
-import statistics
 import sys
+import time
 from collections import defaultdict
 from typing import Dict, List, Optional, Tuple
 
 import aiohttp
+import orjson
 
 # 导入配置
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from config.settings import HELIUS_API_KEY, JUPITER_API_KEY
+from utils.rate_limit import rate_limit_delay
 
 # === ⚙️ 基础配置 ===
 TARGET_TX_COUNT = 20000
@@ -33,8 +35,17 @@ DEXSCREENER_TIMEOUT = 30  # 增加超时时间到 30 秒
 DEXSCREENER_MAX_RETRIES = 2  # 减少重试次数，避免等待太久
 JUPITER_QUOTE_TIMEOUT = 10  # Jupiter API 超时时间
 JUPITER_MAX_RETRIES = 2
+JUPITER_MAX_CONCURRENCY = 8  # 同时在途的 Jupiter 询价请求上限
+HELIUS_MAX_CONCURRENCY = 5  # 同一分析器同时在途的 Helius 请求上限
+PRICE_CACHE_TTL = 60  # 代币价格缓存有效期（秒），在同一分析器的所有钱包间共享
 MIN_COST_THRESHOLD = 0.05  # 最小成本阈值，低于此值的代币不参与分析
 WSOL_MINT = "So11111111111111111111111111111111111111112"  # WSOL 地址
+HTTP_CONNECTOR_LIMIT = 256  # 连接池总连接数上限
+HTTP_CONNECTOR_LIMIT_PER_HOST = 32  # 单个主机（Helius/Jupiter/DexScreener）的连接数上限
+HTTP_DNS_CACHE_TTL = 300  # DNS 解析缓存时间（秒）
+HTTP_KEEPALIVE_TIMEOUT = 60  # 空闲连接保活时间（秒），复用已建立的 TLS 连接
+HTTP_TOTAL_TIMEOUT = 60  # 单个请求的总超时（秒）
+HTTP_CONNECT_TIMEOUT = 10  # 建立连接的超时（秒）
 
 # 配置日志
 logging.basicConfig(
@@ -163,31 +174,48 @@ class TokenAttributionCalculator:
         Returns:
             (buy_attributions, sell_attributions): 买入和卖出的 SOL 归因字典
         """
+        cost_per_token, proceeds_per_token = TokenAttributionCalculator.calculate_rates(
+            sol_change, token_changes
+        )
+        
         buy_attributions = {}
         sell_attributions = {}
+        if cost_per_token > 0:
+            for mint, amt in token_changes.items():
+                if amt > 0:
+                    buy_attributions[mint] = cost_per_token * amt
+        elif proceeds_per_token > 0:
+            for mint, amt in token_changes.items():
+                if amt < 0:
+                    sell_attributions[mint] = proceeds_per_token * -amt
         
-        if abs(sol_change) < 1e-9:
-            return buy_attributions, sell_attributions
-        
-        # 分离买入和卖出
-        buys = {mint: amt for mint, amt in token_changes.items() if amt > 0}
-        sells = {mint: abs(amt) for mint, amt in token_changes.items() if amt < 0}
+        return buy_attributions, sell_attributions
+    
+    @staticmethod
+    def calculate_rates(
+        sol_change: float,
+        token_changes: Dict[str, float]
+    ) -> Tuple[float, float]:
+        """
+        计算单位代币分摊的 SOL 成本/收益（不构造归因字典，供逐笔热循环使用）
         
-        if sol_change < 0:  # 支出 SOL -> 买入成本
-            total_buy_tokens = sum(buys.values())
+        Args:
+            sol_change: SOL 净变动（负数为支出，正数为收入）
+            token_changes: 代币变动字典 {mint: amount}
+            
+        Returns:
+            (cost_per_token, proceeds_per_token): 每单位买入代币的成本、每单位卖出代币的收益，
+            不适用的一项为 0
+        """
+        if sol_change <= -1e-9:  # 支出 SOL -> 买入成本
+            total_buy_tokens = sum(amt for amt in token_changes.values() if amt > 0)
             if total_buy_tokens > 0:
-                cost_per_token = abs(sol_change) / total_buy_tokens
-                for mint, token_amount in buys.items():
-                    buy_attributions[mint] = cost_per_token * token_amount
-        
-        elif sol_change > 0:  # 收入 SOL -> 卖出收益
-            total_sell_tokens = sum(sells.values())
+                return -sol_change / total_buy_tokens, 0.0
+        elif sol_change >= 1e-9:  # 收入 SOL -> 卖出收益
+            total_sell_tokens = -sum(amt for amt in token_changes.values() if amt < 0)
             if total_sell_tokens > 0:
-                proceeds_per_token = sol_change / total_sell_tokens
-                for mint, token_amount in sells.items():
-                    sell_attributions[mint] = proceeds_per_token * token_amount
-        
-        return buy_attributions, sell_attributions
+                return 0.0, sol_change / total_sell_tokens
+        return 0.0, 0.0
 
 
 class PriceFetcher:
@@ -200,17 +228,52 @@ class PriceFetcher:
     - 处理价格缺失情况
     """
     
-    def __init__(self, session: aiohttp.ClientSession, jupiter_api_key: str = None):
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        jupiter_api_key: str = None,
+        price_cache: Optional[Dict[str, Tuple[float, float]]] = None,
+        inflight: Optional[Dict[str, asyncio.Future]] = None
+    ):
         """
         初始化价格获取器
         
         Args:
             session: aiohttp 会话对象
             jupiter_api_key: Jupiter API 密钥（可选）
+            price_cache: 共享价格缓存 {mint: (price_sol, 缓存时间)}（可选，不传则仅本实例使用）
+            inflight: 共享的查询中代币 {mint: Future}（可选），用于合并并发的重复查询
         """
         self.session = session
         self.jupiter_api_key = jupiter_api_key or JUPITER_API_KEY
-        self._price_cache: Dict[str, float] = {}  # 缓存代币的 SOL 价格
+        self._price_cache = price_cache if price_cache is not None else {}
+        self._inflight = inflight if inflight is not None else {}
+        
+        # 请求头和超时在实例生命周期内不变，只构造一次
+        self._jupiter_headers = {"Accept": "application/json"}
+        if self.jupiter_api_key:
+            self._jupiter_headers["x-api-key"] = self.jupiter_api_key
+        self._jupiter_timeout = aiohttp.ClientTimeout(total=JUPITER_QUOTE_TIMEOUT)
+        # 限制在途询价数，避免一次对数百个代币同时发请求触发限流
+        self._jupiter_semaphore = asyncio.Semaphore(JUPITER_MAX_CONCURRENCY)
+    
+    def _get_cached_price(self, mint: str) -> Optional[float]:
+        """
+        读取未过期的缓存价格
+        
+        Args:
+            mint: 代币地址
+            
+        Returns:
+            缓存的 SOL 价格，未缓存或已过期返回 None
+        """
+        entry = self._price_cache.get(mint)
+        if entry is None:
+            return None
+        price, cached_at = entry
+        if time.monotonic() - cached_at > PRICE_CACHE_TTL:
+            return None
+        return price
     
     async def get_token_prices_in_sol(
         self,
@@ -233,17 +296,55 @@ class PriceFetcher:
         prices = {}
         mints_list = list(set(token_mints))  # 去重
         
-        # 使用 Jupiter API 并发获取价格
-        tasks = [self._get_single_token_price_sol(mint, max_retries) for mint in mints_list]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        for mint, result in zip(mints_list, results):
-            if isinstance(result, Exception):
-                logger.debug(f"获取 {mint[:8]}... 价格失败: {result}")
-                continue
-            if result is not None and result > 0:
-                prices[mint] = result
-                self._price_cache[mint] = result
+        # 先取缓存中未过期的价格，其它钱包正在查询的代币直接等待其结果，不重复请求
+        cached_prices = {}
+        pending = {}
+        uncached_mints = []
+        for mint in mints_list:
+            price = self._get_cached_price(mint)
+            if price is not None:
+                cached_prices[mint] = price
+            elif mint in self._inflight:
+                pending[mint] = self._inflight[mint]
+            else:
+                uncached_mints.append(mint)
+        
+        async def fetch_price(mint: str) -> Optional[float]:
+            async with self._jupiter_semaphore:
+                return await self._get_single_token_price_sol(mint, max_retries)
+        
+        # 登记由本次调用负责查询的代币（single-flight），查询结束后统一发布结果
+        loop = asyncio.get_running_loop()
+        owned = {mint: loop.create_future() for mint in uncached_mints}
+        self._inflight.update(owned)
+        try:
+            # 使用 Jupiter API 有限并发获取价格
+            tasks = [fetch_price(mint) for mint in uncached_mints]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            
+            now = time.monotonic()
+            for mint, result in zip(uncached_mints, results):
+                if isinstance(result, Exception):
+                    logger.debug(f"获取 {mint[:8]}... 价格失败: {result}")
+                    continue
+                if result is not None and result > 0:
+                    prices[mint] = result
+                    self._price_cache[mint] = (result, now)
+        finally:
+            for mint, future in owned.items():
+                if self._inflight.get(mint) is future:
+                    del self._inflight[mint]
+                if not future.done():
+                    future.set_result(prices.get(mint))
+        
+        # 等待其它钱包查询中的代币（shield：本协程被取消时不影响共享的 Future）
+        for mint, future in pending.items():
+            price = await asyncio.shield(future)
+            if price:
+                prices[mint] = price
+        
+        # 合并缓存和查询结果
+        prices.update(cached_prices)
         
         return prices
     
@@ -262,10 +363,6 @@ class PriceFetcher:
         Returns:
             代币的 SOL 价格（1 个代币 = 多少 SOL），失败返回 None
         """
-        # 检查缓存
-        if token_mint in self._price_cache:
-            return self._price_cache[token_mint]
-        
         # 如果是 WSOL，直接返回 1
         if token_mint == WSOL_MINT:
             return 1.0
@@ -279,11 +376,8 @@ class PriceFetcher:
         ]
         
         url = "https://api.jup.ag/swap/v1/quote"
-        headers = {"Accept": "application/json"}
-        if self.jupiter_api_key:
-            headers["x-api-key"] = self.jupiter_api_key
-        
-        timeout = aiohttp.ClientTimeout(total=JUPITER_QUOTE_TIMEOUT)
+        headers = self._jupiter_headers
+        timeout = self._jupiter_timeout
         
         for quote_amount in test_amounts:
             params = {
@@ -298,7 +392,7 @@ class PriceFetcher:
                 try:
                     async with self.session.get(url, params=params, headers=headers, timeout=timeout) as resp:
                         if resp.status == 200:
-                            data = await resp.json()
+                            data = orjson.loads(await resp.read())
                             out_amount = int(data.get('outAmount', 0))
                             if out_amount > 0:
                                 # 计算价格：out_amount (lamports) / quote_amount (代币原始单位)
@@ -310,8 +404,8 @@ class PriceFetcher:
                                 if 0.000001 <= price_sol <= 1000:
                                     return price_sol
                         elif resp.status == 429:
-                            wait_time = (attempt + 1) * 2
-                            logger.debug(f"Jupiter rate limited, waiting {wait_time}s")
+                            wait_time = rate_limit_delay(resp.headers.get('Retry-After'), attempt + 1)
+                            logger.debug(f"Jupiter rate limited, waiting {wait_time:.1f}s")
                             await asyncio.sleep(wait_time)
                             continue
                         else:
@@ -356,7 +450,7 @@ class PriceFetcher:
             try:
                 async with self.session.get(url, timeout=timeout) as resp:
                     if resp.status == 200:
-                        data = await resp.json()
+                        data = orjson.loads(await resp.read())
                         pairs = data.get('pairs', [])
                         prices = {}
                         for p in pairs:
@@ -438,25 +532,37 @@ class WalletAnalyzer:
         self.helius_api_key = helius_api_key or HELIUS_API_KEY
         if not self.helius_api_key:
             raise ValueError("HELIUS_API_KEY 未配置")
+        # 限制在途请求数，替代固定的分页间隔 sleep
+        self._helius_semaphore = asyncio.Semaphore(HELIUS_MAX_CONCURRENCY)
+        # 跨钱包共享的代币价格缓存与查询中的代币（热门代币在批量分析中只查询一次）
+        self.price_cache: Dict[str, Tuple[float, float]] = {}
+        self._price_inflight: Dict[str, asyncio.Future] = {}
     
     async def fetch_history_pagination(
         self,
         session: aiohttp.ClientSession,
         address: str,
-        max_count: int = 3000
-    ) -> List[dict]:
+        max_count: int = 3000,
+        target_wallet: Optional[str] = None
+    ) -> List:
         """
         分页获取钱包交易历史
         
+        传入 target_wallet 时每页到达后立即解析为 (sol_change, token_changes, timestamp)，
+        原始 JSON 随即释放，避免上万条交易字典同时驻留内存
+        
         Args:
             session: aiohttp 会话对象
             address: 钱包地址
             max_count: 最大获取数量
+            target_wallet: 目标钱包地址，为 None 时返回原始交易
             
         Returns:
-            交易列表
+            交易列表（原始交易字典，或已解析的交易元组）
         """
+        parse_transaction = TransactionParser(target_wallet).parse_transaction if target_wallet else None
         all_txs = []
+        seen_signatures = set()  # 重试/限流后分页可能返回重叠数据，按签名去重
         last_signature = None
         retry_count = 0
         max_retries = 5
@@ -472,32 +578,49 @@ class WalletAnalyzer:
                 params["before"] = last_signature
             
             try:
-                async with session.get(url, params=params) as resp:
-                    if resp.status == 429:
-                        retry_count += 1
-                        if retry_count > max_retries:
-                            logger.warning(f"Rate limit exceeded, stopping at {len(all_txs)} transactions")
-                            break
-                        wait_time = retry_count * 2
-                        logger.info(f"Rate limited, waiting {wait_time}s")
-                        await asyncio.sleep(wait_time)
-                        continue
-                    
-                    if resp.status != 200:
-                        logger.warning(f"API returned status {resp.status}, stopping")
-                        break
-                    
-                    data = await resp.json()
-                    if not data:
-                        break
-                    
-                    all_txs.extend(data)
-                    if len(data) < 100:
+                async with self._helius_semaphore:
+                    async with session.get(url, params=params) as resp:
+                        status = resp.status
+                        retry_after = resp.headers.get('Retry-After')
+                        data = orjson.loads(await resp.read()) if status == 200 else None
+                
+                if status == 429:
+                    retry_count += 1
+                    if retry_count > max_retries:
+                        logger.warning(f"Rate limit exceeded, stopping at {len(all_txs)} transactions")
                         break
-                    
-                    last_signature = data[-1].get('signature')
-                    retry_count = 0  # 重置重试计数
-                    await asyncio.sleep(0.1)
+                    # 只在被限流时退避（优先遵循 Retry-After，否则指数退避加抖动），正常分页不再固定等待
+                    wait_time = rate_limit_delay(retry_after, retry_count)
+                    logger.info(f"Rate limited, waiting {wait_time:.1f}s")
+                    await asyncio.sleep(wait_time)
+                    continue
+                
+                if status != 200:
+                    logger.warning(f"API returned status {status}, stopping")
+                    break
+                
+                if not data:
+                    break
+                
+                for tx in data:
+                    sig = tx.get('signature')
+                    if sig:
+                        if sig in seen_signatures:
+                            continue
+                        seen_signatures.add(sig)
+                    if parse_transaction is None:
+                        all_txs.append(tx)
+                        continue
+                    # 边拉取边解析，只保留紧凑的解析结果
+                    try:
+                        all_txs.append(parse_transaction(tx))
+                    except Exception as e:
+                        logger.warning(f"Error parsing transaction: {e}")
+                if len(data) < 100:
+                    break
+                
+                last_signature = data[-1].get('signature')
+                retry_count = 0  # 重置重试计数
                     
             except aiohttp.ClientError as e:
                 logger.error(f"Network error fetching transactions: {e}")
@@ -511,8 +634,9 @@ class WalletAnalyzer:
     async def parse_token_projects(
         self,
         session: aiohttp.ClientSession,
-        transactions: List[dict],
-        target_wallet: str
+        transactions: List,
+        target_wallet: str,
+        parsed: bool = False
     ) -> List[dict]:
         """
         解析交易并计算每个代币项目的收益
@@ -521,6 +645,7 @@ class WalletAnalyzer:
             session: aiohttp 会话对象
             transactions: 交易列表
             target_wallet: 目标钱包地址
+            parsed: transactions 是否已由 fetch_history_pagination 边拉取边解析
             
         Returns:
             代币项目分析结果列表
@@ -528,68 +653,66 @@ class WalletAnalyzer:
         # 初始化组件
         parser = TransactionParser(target_wallet)
         attribution_calc = TokenAttributionCalculator()
-        price_fetcher = PriceFetcher(session)
-        
-        # 项目数据：{mint: {buy_sol, sell_sol, buy_tokens, sell_tokens, first_time, last_time}}
-        projects = defaultdict(lambda: {
-            "buy_sol": 0.0,
-            "sell_sol": 0.0,
-            "buy_tokens": 0.0,
-            "sell_tokens": 0.0,
-            "first_time": 0,
-            "last_time": 0
-        })
+        price_fetcher = PriceFetcher(session, price_cache=self.price_cache, inflight=self._price_inflight)
+        
+        # 项目数据按字段分列存放：{mint: 值}，避免为每个代币分配一个嵌套字典
+        buy_sol = defaultdict(float)
+        sell_sol = defaultdict(float)
+        buy_tokens = defaultdict(float)
+        sell_tokens = defaultdict(float)
+        first_time = {}  # 首次出现的有效时间戳
+        last_time = {}  # 最后出现的有效时间戳
+        
+        # 热循环中频繁调用，提前绑定为局部变量
+        parse_transaction = parser.parse_transaction
+        calculate_rates = attribution_calc.calculate_rates
         
         # 按时间倒序处理交易（从最早到最新）
         for tx in reversed(transactions):
             try:
                 # 解析交易
-                sol_change, token_changes, timestamp = parser.parse_transaction(tx)
+                sol_change, token_changes, timestamp = tx if parsed else parse_transaction(tx)
+                # 没有代币变动（如单纯的包装/解包 SOL）的交易不影响任何项目，无需归因
+                if not token_changes:
+                    continue
                 
-                # 计算归因
-                buy_attributions, sell_attributions = attribution_calc.calculate_attribution(
-                    sol_change, token_changes
-                )
+                # 计算归因：只需单位比例，按代币数量直接分摊，无需构造归因字典
+                cost_per_token, proceeds_per_token = calculate_rates(sol_change, token_changes)
                 
                 # 更新项目数据
+                # 无 SOL 的跨代币兑换也在这里计入代币数量（此时归因为 0），不能再单独累加一遍
                 for mint, delta in token_changes.items():
-                    # 更新代币数量
+                    # 更新代币数量和 SOL 成本/收益
                     if delta > 0:
-                        projects[mint]["buy_tokens"] += delta
+                        buy_tokens[mint] += delta
+                        buy_sol[mint] += cost_per_token * delta
                     else:
-                        projects[mint]["sell_tokens"] += abs(delta)
-                    
-                    # 更新 SOL 成本/收益
-                    if mint in buy_attributions:
-                        projects[mint]["buy_sol"] += buy_attributions[mint]
-                    if mint in sell_attributions:
-                        projects[mint]["sell_sol"] += sell_attributions[mint]
+                        sell_tokens[mint] -= delta
+                        sell_sol[mint] -= proceeds_per_token * delta
                     
                     # 更新时间戳
-                    if projects[mint]["first_time"] == 0 and timestamp > 0:
-                        projects[mint]["first_time"] = timestamp
                     if timestamp > 0:
-                        projects[mint]["last_time"] = timestamp
+                        if mint not in first_time:
+                            first_time[mint] = timestamp
+                        last_time[mint] = timestamp
                 
-                # 处理无 SOL 交易的跨代币兑换
-                if abs(sol_change) < 1e-9 and token_changes:
-                    # 跨代币兑换：只记录代币数量，不记录 SOL
-                    for mint, delta in token_changes.items():
-                        if delta > 0:
-                            projects[mint]["buy_tokens"] += delta
-                        else:
-                            projects[mint]["sell_tokens"] += abs(delta)
-                            
             except Exception as e:
                 logger.warning(f"Error parsing transaction: {e}")
                 continue
         
-        # 获取当前价格并计算最终收益（直接获取 SOL 价格，无需 USD 转换）
-        active_mints = [
-            m for m, v in projects.items()
-            if (v["buy_tokens"] - v["sell_tokens"]) > 0 and v["buy_sol"] >= MIN_COST_THRESHOLD
-        ]
+        # 一次遍历筛出达到成本阈值的项目并预先算好剩余持仓，同时收集需要查价的代币
+        # 只卖未买的代币没有买入成本，不会出现在 buy_sol 中
+        qualified = []
+        active_mints = []
+        for mint, cost in buy_sol.items():
+            if cost < MIN_COST_THRESHOLD:
+                continue
+            remaining_tokens = buy_tokens[mint] - sell_tokens.get(mint, 0.0)
+            if remaining_tokens > 0:
+                active_mints.append(mint)
+            qualified.append((mint, cost, max(0, remaining_tokens)))
         
+        # 获取当前价格并计算最终收益（直接获取 SOL 价格，无需 USD 转换）
         logger.info(f"正在获取 {len(active_mints)} 个代币的 SOL 价格...")
         prices_sol = await price_fetcher.get_token_prices_in_sol(active_mints)
         
@@ -601,11 +724,7 @@ class WalletAnalyzer:
         
         # 生成最终结果
         final_results = []
-        for mint, data in projects.items():
-            if data["buy_sol"] < MIN_COST_THRESHOLD:
-                continue
-            
-            remaining_tokens = max(0, data["buy_tokens"] - data["sell_tokens"])
+        for mint, cost, remaining_tokens in qualified:
             price_sol = prices_sol.get(mint, 0)
             
             # 如果价格缺失，只计算已实现收益
@@ -615,18 +734,19 @@ class WalletAnalyzer:
             else:
                 unrealized_sol = remaining_tokens * price_sol
             
-            total_value_sol = data["sell_sol"] + unrealized_sol
-            net_profit = total_value_sol - data["buy_sol"]
-            roi = (total_value_sol / data["buy_sol"] - 1) if data["buy_sol"] > 0 else 0
-            exit_pct = data["sell_tokens"] / data["buy_tokens"] if data["buy_tokens"] > 0 else 0
+            bought = buy_tokens[mint]
+            total_value_sol = sell_sol.get(mint, 0.0) + unrealized_sol
+            net_profit = total_value_sol - cost
+            roi = (total_value_sol / cost - 1) if cost > 0 else 0
+            exit_pct = sell_tokens.get(mint, 0.0) / bought if bought > 0 else 0
             
             hold_time_minutes = 0
-            if data["last_time"] > 0 and data["first_time"] > 0:
-                hold_time_minutes = (data["last_time"] - data["first_time"]) / 60
+            if mint in first_time:
+                hold_time_minutes = (last_time[mint] - first_time[mint]) / 60
             
             final_results.append({
                 "token": mint,
-                "cost": data["buy_sol"],
+                "cost": cost,
                 "profit": net_profit,
                 "roi": roi,
                 "is_win": net_profit > 0,
@@ -638,6 +758,72 @@ class WalletAnalyzer:
         return final_results
 
 
+def median(values: List[float]) -> float:
+    """
+    计算中位数（与 statistics.median 结果一致，省去其逐值类型检查的开销）
+    
+    Args:
+        values: 非空数值列表
+        
+    Returns:
+        中位数
+    """
+    ordered = sorted(values)
+    mid = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[mid]
+    return (ordered[mid - 1] + ordered[mid]) / 2
+
+
+def summarize_results(results: List[dict]) -> Dict[str, float]:
+    """
+    单次遍历汇总代币项目结果（胜负、盈亏、ROI 极值、持仓中位数）
+    
+    Args:
+        results: 代币项目分析结果列表
+        
+    Returns:
+        汇总统计字典
+    """
+    win_count = 0
+    total_profit = 0
+    win_profit = 0
+    loss_profit = 0
+    max_roi = float("-inf")
+    min_roi = float("inf")
+    hold_times = []
+    
+    for r in results:
+        profit = r.get('profit', 0)
+        roi = r.get('roi', 0)
+        hold_time = r.get('hold_time', 0)
+        total_profit += profit
+        if r.get('is_win', False):
+            win_count += 1
+            win_profit += profit
+        else:
+            loss_profit += profit
+        if roi > max_roi:
+            max_roi = roi
+        if roi < min_roi:
+            min_roi = roi
+        if hold_time > 0:
+            hold_times.append(hold_time)
+    
+    count = len(results)
+    return {
+        "count": count,
+        "win_count": win_count,
+        "win_rate": win_count / count if count > 0 else 0,
+        "total_profit": total_profit,
+        "win_profit": win_profit,
+        "loss_profit": loss_profit,
+        "max_roi": max_roi if count > 0 else 0,
+        "min_roi": min_roi if count > 0 else 0,
+        "median_hold": median(hold_times) if hold_times else 0
+    }
+
+
 def get_detailed_scores(results: List[dict]) -> Tuple[int, str, str, Dict[str, int]]:
     """
     计算钱包详细评分和雷达图数据
@@ -655,17 +841,15 @@ def get_detailed_scores(results: List[dict]) -> Tuple[int, str, str, Dict[str, i
     if not results:
         return 0, "F", "无数据", {}
     
-    count = len(results)
-    wins = [r for r in results if r.get('is_win', False)]
-    win_rate = len(wins) / count if count > 0 else 0
-    
-    total_profit = sum(r.get('profit', 0) for r in results)
-    hold_times = [r.get('hold_time', 0) for r in results if r.get('hold_time', 0) > 0]
-    median_hold = statistics.median(hold_times) if hold_times else 0
+    stats = summarize_results(results)
+    count = stats["count"]
+    win_count = stats["win_count"]
+    loss_count = count - win_count
+    win_rate = stats["win_rate"]
+    median_hold = stats["median_hold"]
     
-    avg_win = sum(r.get('profit', 0) for r in wins) / len(wins) if wins else 0
-    losses = [r for r in results if not r.get('is_win', False)]
-    avg_loss = abs(sum(r.get('profit', 0) for r in losses) / len(losses)) if losses else 0
+    avg_win = stats["win_profit"] / win_count if win_count else 0
+    avg_loss = abs(stats["loss_profit"] / loss_count) if loss_count else 0
     profit_factor = avg_win / avg_loss if avg_loss > 0 else (avg_win if avg_win > 0 else 0)
     
     # 基础评分
@@ -692,6 +876,24 @@ def get_detailed_scores(results: List[dict]) -> Tuple[int, str, str, Dict[str, i
     return final_score, tier, description, radar
 
 
+def create_http_session() -> aiohttp.ClientSession:
+    """
+    创建带连接池调优的 aiohttp 会话（复用 TLS 连接、缓存 DNS，并设置显式超时）
+    
+    Returns:
+        aiohttp 会话对象（需由调用方关闭，推荐 async with 使用）
+    """
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_CONNECTOR_LIMIT,
+        limit_per_host=HTTP_CONNECTOR_LIMIT_PER_HOST,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        enable_cleanup_closed=True
+    )
+    timeout = aiohttp.ClientTimeout(total=HTTP_TOTAL_TIMEOUT, sock_connect=HTTP_CONNECT_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
 # 导出函数（保持向后兼容）
 async def fetch_history_pagination(session, address, max_count=3000):
     """向后兼容函数"""
@@ -714,16 +916,16 @@ async def main():
     
     analyzer = WalletAnalyzer()
     
-    async with aiohttp.ClientSession() as session:
+    async with create_http_session() as session:
         print(f"🔍 正在深度审计 V5: {args.wallet[:6]}...")
-        txs = await analyzer.fetch_history_pagination(session, args.wallet, args.max_txs)
+        txs = await analyzer.fetch_history_pagination(session, args.wallet, args.max_txs, target_wallet=args.wallet)
         
         if not txs:
             print("❌ 未获取到交易数据")
             return
         
         print(f"📊 获取到 {len(txs)} 笔交易，开始分析...")
-        results = await analyzer.parse_token_projects(session, txs, args.wallet)
+        results = await analyzer.parse_token_projects(session, txs, args.wallet, parsed=True)
         
         if not results:
             print("❌ 未找到有效的代币项目")
@@ -731,35 +933,35 @@ async def main():
         
         score, tier, desc, radar = get_detailed_scores(results)
         
-        print("\n" + "═" * 60)
-        print(f"🧬 战力报告 (V5): {args.wallet[:6]}...")
-        print("═" * 60)
+        out = []
+        out.append("\n" + "═" * 60)
+        out.append(f"🧬 战力报告 (V5): {args.wallet[:6]}...")
+        out.append("═" * 60)
         
-        wins = [r for r in results if r['is_win']]
-        win_rate = len(wins) / len(results) if results else 0
-        total_profit = sum(r['profit'] for r in results)
-        hold_times = [r['hold_time'] for r in results if r['hold_time'] > 0]
-        median_hold = statistics.median(hold_times) if hold_times else 0
+        stats = summarize_results(results)
+        win_rate = stats["win_rate"]
+        total_profit = stats["total_profit"]
+        median_hold = stats["median_hold"]
         
-        print(f"📊 核心汇总:")
-        print(f"   • 项目胜率: {win_rate:.1%} (基于 {len(results)} 个代币)")
-        print(f"   • 累计利润: {total_profit:+,.2f} SOL")
-        print(f"   • 持仓中位: {median_hold:.1f} 分钟")
+        out.append(f"📊 核心汇总:")
+        out.append(f"   • 项目胜率: {win_rate:.1%} (基于 {len(results)} 个代币)")
+        out.append(f"   • 累计利润: {total_profit:+,.2f} SOL")
+        out.append(f"   • 持仓中位: {median_hold:.1f} 分钟")
         
         confidence = "高" if len(results) > 10 else "低"
-        print("-" * 30)
-        print(f"🎯 战力雷达 (置信度: {confidence}):")
+        out.append("-" * 30)
+        out.append(f"🎯 战力雷达 (置信度: {confidence}):")
         for role, sc in radar.items():
             bar_length = sc // 10
             bar = '█' * bar_length + '░' * (10 - bar_length)
-            print(f"   {role}: {bar} {sc}分")
+            out.append(f"   {role}: {bar} {sc}分")
         
-        print("-" * 30)
-        print(f"🏆 综合评级: [{tier}级] {score} 分")
-        print(f"📝 状态评价: {desc}")
-        print("-" * 30)
+        out.append("-" * 30)
+        out.append(f"🏆 综合评级: [{tier}级] {score} 分")
+        out.append(f"📝 状态评价: {desc}")
+        out.append("-" * 30)
         
-        print("\n📝 重点项目明细 (按利润排序):")
+        out.append("\n📝 重点项目明细 (按利润排序):")
         results_sorted = sorted(results, key=lambda x: x['profit'], reverse=True)
         for r in results_sorted[:8]:
             status_icon = '🟢' if r['is_win'] else '🔴'
@@ -767,7 +969,9 @@ async def main():
             profit = r['profit']
             roi_pct = r['roi'] * 100
             exit_status = r['exit_status']
-            print(f" {status_icon} {token_short} | 利润 {profit:>+7.2f} | ROI {roi_pct:>+7.1f}% | 退出度 {exit_status}")
+            out.append(f" {status_icon} {token_short} | 利润 {profit:>+7.2f} | ROI {roi_pct:>+7.1f}% | 退出度 {exit_status}")
+        
+        sys.stdout.write("\n".join(out) + "\n")
 
 
 if __name__ == "__main__":
@@ -5,18 +5,19 @@
 @Description: 批量钱包分析工具 (V5 优化版)
               - 批量分析多个钱包地址
               - 自动黑名单过滤低质量钱包
-              - 导出 Excel 报告
+              - 导出 CSV / Excel 报告
               - 改进错误处理和日志记录
 @Author     : Auto-generated
 @Date       : 2026-02-01
 """
+import argparse
 import asyncio
+import atexit
 import logging
 import os
-import re
-import statistics
 import sys
 from datetime import datetime
+from operator import itemgetter
 from pathlib import Path
 from typing import Dict, List, Optional, Set
 
@@ -24,12 +25,17 @@ import aiohttp
 import pandas as pd
 from tqdm.asyncio import tqdm
 
+try:
+    import xlsxwriter  # 可选依赖：写 Excel 比 openpyxl 快得多，未安装时回退到 openpyxl
+except ImportError:
+    xlsxwriter = None
+
 # 确保能找到 analyze_wallet 模块
 current_dir = Path(__file__).parent
 sys.path.insert(0, str(current_dir))
 
 try:
-    from analyze_wallet import WalletAnalyzer, get_detailed_scores
+    from analyze_wallet import WalletAnalyzer, create_http_session, get_detailed_scores, summarize_results
 except ImportError:
     print("❌ 错误：找不到 analyze_wallet 模块")
     sys.exit(1)
@@ -50,6 +56,17 @@ RESULTS_DIR = str(TOOLS_DIR / "results")
 MIN_SCORE_THRESHOLD_1 = 45  # 评分阈值1：低于此值且代币数>=10时加入黑名单
 MIN_SCORE_THRESHOLD_2 = 20  # 评分阈值2：低于此值直接加入黑名单
 CONCURRENT_LIMIT = 3  # 并发限制
+TRASH_FLUSH_THRESHOLD = 50  # 黑名单缓冲地址数达到该值时批量写入文件
+PROGRESS_REFRESH_INTERVAL = 0.1  # 进度条刷新间隔（秒），由单个后台任务统一刷新
+EXCEL_MAX_ROWS = 50_000  # 自动模式下超过该行数只导出 CSV，不再生成 Excel（XML 序列化过慢，与 SMV2 取值一致）
+BASE58_BYTES = b"123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"  # Base58 字符集：不包含 0, O, I, l
+# 不作为钱包的地址（系统地址、系统程序、Token 程序、关联账户程序），集合判断为 O(1)
+EXCLUDED_ADDRESSES = frozenset({
+    "So11111111111111111111111111111111111111111",  # 系统地址
+    "11111111111111111111111111111111",  # System Program
+    "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA",  # Token Program
+    "ATokenGPvbdGVxr1b2hvZbsiqW5xWH25efTNsLJA8knL",  # Associated Token Account Program
+})
 
 
 def is_valid_solana_address(address: str) -> bool:
@@ -65,19 +82,14 @@ def is_valid_solana_address(address: str) -> bool:
     if not address or not isinstance(address, str):
         return False
     
-    # Solana 地址长度通常在 32-44 位，使用 Base58 字符集
-    if not (32 <= len(address) <= 44):
-        return False
-    
-    # Base58 字符集：不包含 0, O, I, l
-    if not re.match(r'^[1-9A-HJ-NP-Za-km-z]+$', address):
+    # 排除系统地址和程序地址
+    if address in EXCLUDED_ADDRESSES:
         return False
     
-    # 排除系统地址
-    if address == "So11111111111111111111111111111111111111111":
+    # Solana 地址长度 32-44 位，使用 Base58 字符集（删除所有合法字节后应为空，整个检查在 C 层完成，无需正则引擎）
+    if not (32 <= len(address) <= 44):
         return False
-    
-    return True
+    return address.isascii() and not address.encode().translate(None, BASE58_BYTES)
 
 
 class WalletListSaver:
@@ -88,7 +100,8 @@ class WalletListSaver:
     @staticmethod
     def save_valid_addresses(
         addresses: List[str],
-        wallets_file: str = WALLETS_FILE
+        wallets_file: str = WALLETS_FILE,
+        skip_validation: bool = False
     ) -> bool:
         """
         保存有效的钱包地址到文件（去重、验证格式）
@@ -96,6 +109,7 @@ class WalletListSaver:
         Args:
             addresses: 钱包地址列表
             wallets_file: 钱包列表文件路径
+            skip_validation: 地址已在上游校验过时跳过格式校验（只去重）
             
         Returns:
             是否成功保存
@@ -106,23 +120,24 @@ class WalletListSaver:
         
         try:
             # 验证并去重
-            valid_addresses = set()
-            for addr in addresses:
-                addr = addr.strip()
-                if addr and is_valid_solana_address(addr):
-                    valid_addresses.add(addr)
+            if skip_validation:
+                valid_addresses = set(addresses)
+            else:
+                # is_valid_solana_address 已拒绝空串，集合推导直接完成去空、校验和去重
+                valid_addresses = {addr for addr in map(str.strip, addresses) if is_valid_solana_address(addr)}
             
             if not valid_addresses:
                 logger.warning("没有有效的钱包地址需要保存")
                 return False
             
-            # 排序并保存
-            sorted_addresses = sorted(list(valid_addresses))
-            
-            with open(wallets_file, 'w', encoding='utf-8') as f:
-                for addr in sorted_addresses:
-                    f.write(f"{addr}\n")
-            
+            # 排序后先写入临时文件，再原子替换原文件（中途中断不会留下被截断的钱包列表）
+            sorted_addresses = sorted(valid_addresses)
+            tmp_file = wallets_file + ".tmp"
+
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write("\n".join(sorted_addresses) + "\n")
+            os.replace(tmp_file, wallets_file)
+
             logger.info(f"已保存 {len(sorted_addresses)} 个有效钱包地址到 {wallets_file}")
             return True
             
@@ -141,15 +156,20 @@ class TrashListManager:
     - 检查地址是否在黑名单中
     """
     
-    def __init__(self, trash_file: str = TRASH_FILE):
+    def __init__(self, trash_file: str = TRASH_FILE, flush_threshold: int = TRASH_FLUSH_THRESHOLD):
         """
         初始化黑名单管理器
         
         Args:
             trash_file: 黑名单文件路径
+            flush_threshold: 缓冲地址数达到该值时批量写入文件
         """
         self.trash_file = trash_file
+        self.flush_threshold = flush_threshold
         self._trash_set: Optional[Set[str]] = None
+        self._pending: List[str] = []  # 已加入黑名单但尚未写入文件的地址
+        # 兜底：调用方未显式 flush() 时，解释器退出前写入剩余缓冲
+        atexit.register(self.flush)
     
     def load(self) -> Set[str]:
         """
@@ -162,40 +182,64 @@ class TrashListManager:
             return self._trash_set
         
         if not os.path.exists(self.trash_file):
-            self._trash_set = set()
+            self._trash_set = set(self._pending)
             return self._trash_set
         
         try:
+            # 一次读入后在 C 层按行切分，避免逐行迭代文件对象
             with open(self.trash_file, 'r', encoding='utf-8') as f:
-                self._trash_set = {line.strip() for line in f if line.strip()}
+                self._trash_set = set(map(str.strip, f.read().splitlines()))
+            self._trash_set.discard("")
             logger.info(f"加载黑名单: {len(self._trash_set)} 个地址")
         except Exception as e:
             logger.error(f"加载黑名单失败: {e}")
             self._trash_set = set()
         
+        # 缓冲中尚未写入文件的地址也属于黑名单
+        self._trash_set.update(self._pending)
         return self._trash_set
     
     def add(self, address: str) -> bool:
         """
         添加地址到黑名单
         
+        地址先进入内存缓冲，累计到 flush_threshold 个时一次性追加写入文件；
+        结束前需调用 flush() 写入剩余地址（进程退出时也会自动 flush）
+        
         Args:
             address: 钱包地址
             
         Returns:
             是否成功添加
         """
+        if self._trash_set is not None:
+            if address in self._trash_set:
+                return True
+            self._trash_set.add(address)
+        self._pending.append(address)
+        logger.debug(f"已添加地址到黑名单: {address[:6]}...")
+        
+        if len(self._pending) >= self.flush_threshold:
+            return self.flush()
+        return True
+    
+    def flush(self) -> bool:
+        """
+        将缓冲中的黑名单地址批量追加写入文件
+        
+        Returns:
+            是否成功写入（无待写入地址时返回 True）
+        """
+        if not self._pending:
+            return True
+        
         try:
             with open(self.trash_file, 'a', encoding='utf-8') as f:
-                f.write(f"{address}\n")
-            
-            if self._trash_set is not None:
-                self._trash_set.add(address)
-            
-            logger.debug(f"已添加地址到黑名单: {address[:6]}...")
+                f.writelines(f"{addr}\n" for addr in self._pending)
+            self._pending.clear()
             return True
         except Exception as e:
-            logger.error(f"添加黑名单失败: {e}")
+            logger.error(f"写入黑名单失败: {e}")
             return False
     
     def contains(self, address: str) -> bool:
@@ -208,9 +252,8 @@ class TrashListManager:
         Returns:
             是否在黑名单中
         """
-        if self._trash_set is None:
-            self.load()
-        return address in (self._trash_set or set())
+        # load() 带缓存，首次调用后直接返回内存中的集合
+        return address in self.load()
 
 
 class WalletListLoader:
@@ -235,12 +278,12 @@ class WalletListLoader:
         
         try:
             with open(wallets_file, 'r', encoding='utf-8') as f:
-                addresses = [
-                    line.strip()
-                    for line in f
-                    if line.strip() and not line.startswith("#")
-                ]
-                addresses = list(set(addresses))
+                # 单次遍历去重，保持文件中的顺序
+                addresses = list(dict.fromkeys(
+                    addr
+                    for addr in map(str.strip, f.read().splitlines())
+                    if addr and not addr.startswith("#")
+                ))
             logger.info(f"从 {wallets_file} 加载了 {len(addresses)} 个地址")
             return addresses
         except Exception as e:
@@ -253,13 +296,13 @@ class BatchAnalyzer:
     批量分析器：负责批量分析多个钱包
     
     职责：
-    - 并发分析多个钱包（数据处理并发，API调用串行）
+    - 并发分析多个钱包（数据处理并发，API调用有限并发）
     - 自动过滤低质量钱包
     - 生成分析报告
     
     设计：
     - 使用生产者-消费者模式
-    - API调用（Helius/Jupiter）串行化，避免并发调用
+    - API调用（Helius/Jupiter）按钱包有限并发，Helius 请求总量由分析器内部信号量兜底
     - 数据处理（解析、评分计算）可以并发
     """
     
@@ -275,22 +318,23 @@ class BatchAnalyzer:
         Args:
             analyzer: 钱包分析器实例
             trash_manager: 黑名单管理器实例
-            concurrent_limit: 数据处理并发限制（API调用始终串行）
+            concurrent_limit: 并发限制（同时处于 API 阶段的钱包数、数据处理并发数）
         """
         self.analyzer = analyzer
         self.trash_manager = trash_manager
         self.concurrent_limit = concurrent_limit
         # 数据处理并发控制
         self.data_processing_semaphore = asyncio.Semaphore(concurrent_limit)
-        # API调用串行化锁（确保同一时间只有一个API调用）
-        self.api_lock = asyncio.Semaphore(1)
+        # API阶段并发控制：最多 concurrent_limit 个钱包同时拉取数据
+        # （Helius 请求总量另由 WalletAnalyzer 内部的信号量限制）
+        self.api_semaphore = asyncio.Semaphore(concurrent_limit)
     
     async def analyze_one_wallet(
         self,
         session: aiohttp.ClientSession,
         address: str,
-        pbar: tqdm,
-        max_txs: int = 5000
+        max_txs: int = 5000,
+        analysis_time: Optional[str] = None
     ) -> Optional[Dict]:
         """
         分析单个钱包（生产者-消费者模式）
@@ -298,26 +342,24 @@ class BatchAnalyzer:
         Args:
             session: aiohttp 会话对象
             address: 钱包地址
-            pbar: 进度条对象
             max_txs: 最大交易数量
+            analysis_time: 分析时间（批量分析时整批共用一个，为 None 时取当前时间）
             
         Returns:
             分析结果字典，如果失败或应过滤则返回 None
         """
         try:
-            # === 阶段1：API调用（串行化）===
-            # 使用 API 锁确保同一时间只有一个 API 调用
-            async with self.api_lock:
+            # === 阶段1：API调用（有限并发）===
+            # 使用 API 信号量限制同时拉取数据的钱包数
+            async with self.api_semaphore:
                 # 1. 拉取交易数据（Helius API）
-                txs = await self.analyzer.fetch_history_pagination(session, address, max_txs)
+                txs = await self.analyzer.fetch_history_pagination(session, address, max_txs, target_wallet=address)
                 if not txs:
-                    pbar.update(1)
                     return None
                 
                 # 2. 解析代币项目（内部会调用 Jupiter API）
-                results = await self.analyzer.parse_token_projects(session, txs, address)
+                results = await self.analyzer.parse_token_projects(session, txs, address, parsed=True)
                 if not results:
-                    pbar.update(1)
                     return None
             
             # === 阶段2：数据处理（可以并发）===
@@ -329,25 +371,22 @@ class BatchAnalyzer:
                 # 4. 自动黑名单过滤
                 if score < MIN_SCORE_THRESHOLD_1 and len(results) >= 10:
                     self.trash_manager.add(address)
-                    pbar.update(1)
                     return None
                 elif score < MIN_SCORE_THRESHOLD_2 and len(results) >= 5:
                     self.trash_manager.add(address)
-                    pbar.update(1)
                     return None
                 
                 # 5. 提取最佳定位
                 best_role = "未知"
                 if radar:
-                    best_role = max(radar, key=radar.get)
+                    best_role, _ = max(radar.items(), key=itemgetter(1))
                 
                 # 6. 计算基础指标（纯数据处理）
-                wins = [r for r in results if r.get('is_win', False)]
-                win_rate = len(wins) / len(results) if results else 0
-                total_profit = sum(r.get('profit', 0) for r in results)
-                max_roi = max([r.get('roi', 0) for r in results]) if results else 0
-                hold_times = [r.get('hold_time', 0) for r in results if r.get('hold_time', 0) > 0]
-                median_hold = statistics.median(hold_times) if hold_times else 0
+                stats = summarize_results(results)
+                win_rate = stats["win_rate"]
+                total_profit = stats["total_profit"]
+                max_roi = stats["max_roi"]
+                median_hold = stats["median_hold"]
                 
                 # 提取置信度
                 confidence = "高" if len(results) > 10 else "低"
@@ -360,7 +399,6 @@ class BatchAnalyzer:
                 except (ValueError, IndexError):
                     logger.warning(f"无法解析盈亏比: {desc}")
                 
-                pbar.update(1)
                 return {
                     "钱包地址": address,
                     "综合评分": score,
@@ -373,12 +411,11 @@ class BatchAnalyzer:
                     "最大单笔ROI": f"{max_roi:.0%}",
                     "中位持仓(分)": round(median_hold, 1),
                     "代币数": len(results),
-                    "分析时间": datetime.now().strftime("%Y-%m-%d %H:%M")
+                    "分析时间": analysis_time or datetime.now().strftime("%Y-%m-%d %H:%M")
                 }
             
         except Exception as e:
             logger.error(f"分析钱包 {address[:6]}... 时出错: {e}")
-            pbar.update(1)
             return None
     
     async def analyze_batch(
@@ -391,7 +428,7 @@ class BatchAnalyzer:
         
         设计：
         - 所有任务并发创建（生产者）
-        - API调用串行化（通过api_lock）
+        - API调用有限并发（通过api_semaphore）
         - 数据处理并发（通过data_processing_semaphore）
         
         Args:
@@ -402,39 +439,63 @@ class BatchAnalyzer:
             分析结果列表
         """
         pbar = tqdm(total=len(addresses), desc="📊 审计进度", unit="钱包", colour="green")
+        analysis_time = datetime.now().strftime("%Y-%m-%d %H:%M")  # 整批共用同一个分析时间，不在每个钱包上重复格式化
+        processed_count = 0  # 已处理的钱包数（含失败/过滤），由进度条刷新任务读取
         
         async def analyze_task(session, addr):
             """
             单个钱包分析任务（生产者）
-            内部会通过锁控制API调用串行，数据处理并发
+            内部会通过信号量控制API调用并发，数据处理并发
+            """
+            nonlocal processed_count
+            try:
+                return await self.analyze_one_wallet(session, addr, max_txs, analysis_time)
+            finally:
+                processed_count += 1
+        
+        async def refresh_progress():
             """
-            return await self.analyze_one_wallet(session, addr, pbar, max_txs)
+            定时刷新进度条（单个后台任务统一写终端，避免每个任务各自 update 争用 tqdm 内部锁）
+            """
+            while True:
+                if pbar.n != processed_count:
+                    pbar.n = processed_count
+                    pbar.refresh()
+                await asyncio.sleep(PROGRESS_REFRESH_INTERVAL)
         
         # 创建所有任务并发执行（生产者模式）
-        # API调用会在内部通过api_lock串行化
+        # API调用会在内部通过api_semaphore限制并发
         # 数据处理可以通过data_processing_semaphore并发
-        async with aiohttp.ClientSession() as session:
-            tasks = [analyze_task(session, addr) for addr in addresses]
-            raw_results = await asyncio.gather(*tasks)
-            results = [r for r in raw_results if r is not None]
+        progress_task = asyncio.create_task(refresh_progress())
+        try:
+            async with create_http_session() as session:
+                tasks = [analyze_task(session, addr) for addr in addresses]
+                raw_results = await asyncio.gather(*tasks)
+                results = [r for r in raw_results if r is not None]
+        finally:
+            progress_task.cancel()
+            # 等待刷新任务真正退出，避免其在 pbar.close() 之后再刷新进度条
+            await asyncio.gather(progress_task, return_exceptions=True)
         
+        pbar.n = processed_count
         pbar.close()
         return results
 
 
 class ReportExporter:
     """
-    报告导出器：负责导出分析结果到 Excel
+    报告导出器：负责导出分析结果到 CSV / Excel
     """
     
     @staticmethod
-    def export(results: List[Dict], output_dir: str = RESULTS_DIR) -> Optional[str]:
+    def export(results: List[Dict], output_dir: str = RESULTS_DIR, output_format: str = "auto") -> Optional[str]:
         """
-        导出分析结果到 Excel
+        导出分析结果到 CSV 或 Excel
         
         Args:
             results: 分析结果列表
             output_dir: 输出目录
+            output_format: 导出格式，csv / xlsx / auto（auto 时行数不超过 EXCEL_MAX_ROWS 才生成 Excel，否则导出 CSV）
             
         Returns:
             输出文件路径，如果失败则返回 None
@@ -449,8 +510,14 @@ class ReportExporter:
         try:
             df = pd.DataFrame(results).sort_values(by="综合评分", ascending=False)
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_file = os.path.join(output_dir, f"wallet_ranking_v5_{timestamp}.xlsx")
-            df.to_excel(output_file, index=False, engine='openpyxl')
+            base_path = os.path.join(output_dir, f"wallet_ranking_v5_{timestamp}")
+            if output_format == "xlsx" or (output_format == "auto" and len(df) <= EXCEL_MAX_ROWS):
+                output_file = base_path + ".xlsx"
+                df.to_excel(output_file, index=False, engine='xlsxwriter' if xlsxwriter is not None else 'openpyxl')
+            else:
+                # CSV 无需构建单元格对象和压缩 XML，写入速度远快于 Excel（utf-8-sig 便于 Excel 直接打开中文列名）
+                output_file = base_path + ".csv"
+                df.to_csv(output_file, index=False, encoding='utf-8-sig')
             logger.info(f"导出成功: {output_file} ({len(results)} 条记录)")
             return output_file
         except Exception as e:
@@ -458,8 +525,13 @@ class ReportExporter:
             return None
 
 
-async def main():
-    """主函数：批量分析入口"""
+async def main(output_format: str = "auto"):
+    """
+    主函数：批量分析入口
+    
+    Args:
+        output_format: 报告导出格式（csv / xlsx / auto）
+    """
     # 初始化组件
     analyzer = WalletAnalyzer()
     trash_manager = TrashListManager()
@@ -475,7 +547,7 @@ async def main():
         return
     
     # 过滤黑名单
-    addresses = [a for a in all_addresses if not trash_manager.contains(a)]
+    addresses = [a for a in all_addresses if a not in trash_set]
     skip_count = len(all_addresses) - len(addresses)
     
     if not addresses:
@@ -485,11 +557,16 @@ async def main():
     print(f"🚀 启动批量分析 V5 | 任务数: {len(addresses)} (跳过黑名单: {skip_count})")
     
     # 执行批量分析
-    results = await batch_analyzer.analyze_batch(addresses)
+    try:
+        results = await batch_analyzer.analyze_batch(addresses)
+    finally:
+        # 写入缓冲中的黑名单地址
+        trash_manager.flush()
     
-    # 导出结果
+    # 导出结果（放到线程池执行，写文件期间不阻塞事件循环）
     if results:
-        output_file = exporter.export(results)
+        loop = asyncio.get_running_loop()
+        output_file = await loop.run_in_executor(None, exporter.export, results, RESULTS_DIR, output_format)
         if output_file:
             print(f"\n✅ 导出成功: {output_file}")
         else:
@@ -497,25 +574,12 @@ async def main():
     else:
         print("\n🏁 分析结果为空，请检查报错或地址列表。")
     
-    # 收集所有有效的钱包地址（从分析结果和原始列表中提取）
-    valid_addresses = set()
-    
-    # 1. 从分析结果中提取（这些是成功分析的钱包）
-    if results:
-        for r in results:
-            addr = r.get('钱包地址', '').strip()
-            if addr and is_valid_solana_address(addr):
-                valid_addresses.add(addr)
-    
-    # 2. 从原始列表中提取（包括未分析但格式正确的地址）
-    for addr in all_addresses:
-        addr = addr.strip()
-        if addr and is_valid_solana_address(addr):
-            valid_addresses.add(addr)
+    # 收集所有有效的钱包地址（分析结果中的地址都来自原始列表，只需对原始列表校验一次）
+    valid_addresses = {addr for addr in map(str.strip, all_addresses) if is_valid_solana_address(addr)}
     
-    # 3. 保存有效的钱包地址回文件
+    # 保存有效的钱包地址回文件（已校验，保存时只需去重）
     if valid_addresses:
-        saved = WalletListSaver.save_valid_addresses(list(valid_addresses), WALLETS_FILE)
+        saved = WalletListSaver.save_valid_addresses(list(valid_addresses), WALLETS_FILE, skip_validation=True)
         if saved:
             print(f"\n✅ 已过滤并保存 {len(valid_addresses)} 个有效钱包地址到 {WALLETS_FILE}")
         else:
@@ -525,4 +589,9 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="批量钱包分析工具")
+    parser.add_argument(
+        "--format", dest="output_format", choices=["auto", "csv", "xlsx"], default="auto",
+        help=f"报告导出格式：csv 写入最快；xlsx 便于查看但写入慢得多；auto 在结果不超过 {EXCEL_MAX_ROWS} 行时导出 xlsx，否则导出 csv")
+    args = parser.parse_args()
+    asyncio.run(main(args.output_format))
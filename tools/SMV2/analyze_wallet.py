@@ -12,31 +12,49 @@
 """
 import argparse
 import asyncio
+import heapq
 import json
 import logging
 import os
-import statistics
 import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
 from datetime import datetime
+from functools import lru_cache
+from operator import attrgetter
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
 import aiohttp
 import duckdb
+import orjson
 
 # 导入配置
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from config.settings import HELIUS_API_KEY, JUPITER_API_KEY
+from utils.rate_limit import rate_limit_delay
 
 # === ⚙️ 基础配置 ===
 TARGET_TX_COUNT = 2000
 JUPITER_QUOTE_TIMEOUT = 3  # 降低超时时间以提升速度（从5秒降到3秒）
 JUPITER_MAX_RETRIES = 1  # 减少重试次数以提升速度
+JUPITER_PRICE_URL = "https://api.jup.ag/price/v3"  # Jupiter 批量价格接口（USD 计价）
+JUPITER_PRICE_BATCH_SIZE = 50  # 单次批量价格请求的代币数上限
+PRICE_CACHE_TTL = 60  # 代币价格缓存有效期（秒），在同一分析器的所有钱包间共享
 MIN_COST_THRESHOLD = 0.05  # 最小成本阈值
 DUST_THRESHOLD = 0.01  # 粉尘阈值：未实现收益低于此值的代币视为粉尘
 WSOL_MINT = "So11111111111111111111111111111111111111112"
 
+# HTTP 连接池配置（所有 Helius/Jupiter 请求共用一个会话，复用 TLS 连接与 DNS 结果）
+HTTP_CONNECTOR_LIMIT = 64  # 连接池总连接数上限
+HTTP_CONNECTOR_LIMIT_PER_HOST = 32  # 单个主机连接数上限
+HTTP_DNS_CACHE_TTL = 300  # DNS 缓存时间（秒）
+HTTP_KEEPALIVE_TIMEOUT = 60  # 空闲连接保活时间（秒）
+HTTP_TOTAL_TIMEOUT = 60  # 单个请求总超时（秒），单次请求可自行传入更短的 timeout 覆盖
+HTTP_CONNECT_TIMEOUT = 10  # 建立连接超时（秒）
+
 # 数据库配置
 DB_DIR = Path(__file__).parent / "data"
 DB_FILE = DB_DIR / "transactions.duckdb"
@@ -55,6 +73,38 @@ S_TIER_MIN_PROFIT_30D = 200  # 30天总盈利 (SOL)
 S_TIER_MIN_HOLD_TIME_HOURS = 2  # 平均持仓时间 (小时)
 S_TIER_MAX_SINGLE_LOSS = -0.50  # 最大单笔亏损不能超过 -50%
 
+# 钱包定位名称（定位评分字典的键，批量报告中也作为列名）
+ROLE_STABLE = "🛡️ 稳健中军"
+ROLE_HUNTER = "⚔️ 土狗猎手"
+ROLE_DIAMOND = "💎 钻石之手"
+ROLE_SHORT_TERM = "🚀 短线高手"
+
+# 评分阶梯：(阈值升序, 得分)，value >= 阈值[i] 得 得分[i+1]，低于全部阈值或 value <= 0 得 得分[0]
+# 每个维度各阶梯最高分之和恰为 100，维度分无需再截断
+# 首个阈值为 0 的阶梯表示「> 0」档位：value <= 0 在查表前单独处理，因此 0 本身不进入该档
+PROFIT_FACTOR_LADDER = ((0, 1, 1.5, 2, 3, 5), (0, 5, 10, 15, 20, 25, 30))
+PROFIT_PCT_30D_LADDER = ((0, 10, 30, 50, 80, 100), (0, 5, 10, 15, 20, 25, 30))
+PROFIT_PCT_7D_LADDER = ((0, 10, 20, 30), (0, 5, 10, 15, 20))
+MAX_ROI_LADDER = ((1, 2, 5, 10), (0, 5, 10, 15, 20))
+WIN_RATE_LADDER = ((0, 0.40, 0.45, 0.50, 0.55, 0.60, 0.65, 0.70), (0, 5, 10, 15, 20, 25, 30, 35, 40))
+TOKENS_30D_LADDER = ((0, 5, 10, 20, 30, 50), (0, 5, 10, 15, 20, 25, 30))
+TOKENS_7D_LADDER = ((0, 3, 5, 10, 15, 20), (0, 5, 10, 15, 20, 25, 30))
+UNIQUE_TOKENS_LADDER = ((2, 3, 5, 10, 20, 30, 50), (0, 10, 15, 20, 25, 30, 35, 40))
+# 盈利/亏损持仓时间比：[1.2, 3.0] 得 20，[0.8, 1.2) 得 15，其余 5；超过 HOLD_TIME_RATIO_MAX 单独判断
+HOLD_TIME_RATIO_LADDER = ((0.8, 1.2), (5, 15, 20))
+HOLD_TIME_RATIO_MAX = 3.0  # 盈利/亏损持仓时间比上限（含），超过视为差异过大
+HOLD_TIME_RATIO_OVER_SCORE = 10  # 持仓时间比超过上限时的得分
+# 平均持仓时间（分钟）为嵌套区间 [5,2880] ⊃ [15,1440] ⊃ [30,720] ⊃ [60,480]，
+# 落在第 k 层得 HOLD_TIME_BAND_SCORES[k]，第 0 层（不在任何区间内但 > 0）得 10
+HOLD_TIME_BAND_LOWS = (5, 15, 30, 60)
+HOLD_TIME_BAND_HIGHS = (480, 720, 1440, 2880)
+HOLD_TIME_BAND_SCORES = (10, 25, 30, 35, 40)
+# 最终评级：>= 90 S，>= 80 A，>= 70 B，>= 60 C，其余 F
+TIER_CUTOFFS = (60, 70, 80, 90)
+TIERS = ("F", "C", "B", "A", "S")
+# 定位评分条形图：SCORE_BARS[i] 为 i 格实心 + (10 - i) 格空心，预先生成避免逐行拼接
+SCORE_BARS = tuple('█' * i + '░' * (10 - i) for i in range(11))
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -147,9 +197,9 @@ class TransactionDBManager:
             transactions = []
             for row in result:
                 try:
-                    tx_data = json.loads(row[0]) if isinstance(row[0], str) else row[0]
+                    tx_data = orjson.loads(row[0]) if isinstance(row[0], str) else row[0]
                     transactions.append(tx_data)
-                except (json.JSONDecodeError, TypeError) as e:
+                except (orjson.JSONDecodeError, TypeError) as e:
                     logger.warning(f"解析交易数据失败: {e}")
                     continue
             
@@ -196,7 +246,7 @@ class TransactionDBManager:
                     continue
                 
                 try:
-                    tx_json = json.dumps(tx, ensure_ascii=False) if not isinstance(tx, str) else tx
+                    tx_json = tx if isinstance(tx, str) else self._dumps_tx(tx)
                     # 使用 INSERT OR IGNORE 避免并发插入时的重复键冲突
                     # 如果记录已存在，则忽略插入（不报错）
                     conn.execute(
@@ -225,6 +275,22 @@ class TransactionDBManager:
                 except Exception as e:
                     logger.warning(f"关闭数据库连接失败: {e}")
     
+    @staticmethod
+    def _dumps_tx(tx: dict) -> str:
+        """
+        序列化交易记录（优先 orjson；遇到 orjson 不支持的值，如超出 64 位的整数，回退到标准库）
+        
+        Args:
+            tx: 交易记录
+            
+        Returns:
+            JSON 字符串
+        """
+        try:
+            return orjson.dumps(tx).decode()
+        except TypeError:
+            return json.dumps(tx, ensure_ascii=False)
+    
     def get_transaction_count(self, address: str) -> int:
         """
         获取指定地址的交易记录数量
@@ -274,7 +340,8 @@ class TransactionParser:
             wsol_mint: WSOL 代币地址
         """
         self.target_wallet = target_wallet
-        self.wsol_mint = wsol_mint
+        # mint 统一驻留（intern），WSOL 判断与后续按 mint 的字典查找都可命中同一对象
+        self.wsol_mint = sys.intern(wsol_mint)
     
     def parse_transaction(self, tx: dict) -> Tuple[float, Dict[str, float], int]:
         """
@@ -300,46 +367,58 @@ class TransactionParser:
         else:
             timestamp = int(timestamp_raw)
         
-        token_transfers = tx.get('tokenTransfers', [])
-        native_transfers = tx.get('nativeTransfers', [])
+        # Helius 的转账记录字段齐全，热循环中直接下标取值（比 dict.get 更快），
+        # 个别缺字段的异常记录按 KeyError 跳过
+        target_wallet = self.target_wallet
+        wsol_mint = self.wsol_mint
+        intern = sys.intern
         
         native_sol_change = 0.0
         wsol_change = 0.0
         token_changes = defaultdict(float)
         
         # --- 1. 处理 Token 转账（参考 monitor.py 的逻辑）---
-        for tx_transfer in token_transfers:
-            mint = tx_transfer.get('mint', '')
-            token_amount = tx_transfer.get('tokenAmount', 0)
+        for tx_transfer in tx.get('tokenTransfers') or ():
+            try:
+                # 同一代币在成千上万笔交易中重复出现，驻留后各层字典共享一个 key 对象
+                mint = intern(tx_transfer['mint'])
+                token_amount = tx_transfer['tokenAmount']
+                from_account = tx_transfer['fromUserAccount']
+                to_account = tx_transfer['toUserAccount']
+            except KeyError:
+                continue
             
             # 🛡️ 特殊处理 WSOL：计入成本/收益，但不作为买卖目标
-            if mint == self.wsol_mint:
+            if mint == wsol_mint:
                 # Helius 的 tokenTransfers 通常已经是 Decimal 格式 (如 4.95)
                 # 不需要除以 1e9，直接使用
-                wsol_amount = float(token_amount)
-                
-                if tx_transfer.get('fromUserAccount') == self.target_wallet:
-                    wsol_change -= wsol_amount
-                elif tx_transfer.get('toUserAccount') == self.target_wallet:
-                    wsol_change += wsol_amount
+                if from_account == target_wallet:
+                    wsol_change -= float(token_amount)
+                elif to_account == target_wallet:
+                    wsol_change += float(token_amount)
                 continue
             
             # 处理其他代币（非 WSOL）
             # 其他代币的 tokenAmount 格式处理（通常已经是小数格式）
             # 注意：不同代币的 decimals 不同，但 Helius API 通常已经转换为小数格式
-            if tx_transfer.get('fromUserAccount') == self.target_wallet:
+            if from_account == target_wallet:
                 token_changes[mint] -= float(token_amount)
-            elif tx_transfer.get('toUserAccount') == self.target_wallet:
+            elif to_account == target_wallet:
                 token_changes[mint] += float(token_amount)
         
         # --- 2. 处理 Native SOL 转账（参考 monitor.py 的逻辑）---
         sol_balance_change = 0
         
-        for nt in native_transfers:
-            amount = nt.get('amount', 0)  # 这是 lamports
-            if nt.get('fromUserAccount') == self.target_wallet:
+        for nt in tx.get('nativeTransfers') or ():
+            try:
+                amount = nt['amount']  # 这是 lamports
+                from_account = nt['fromUserAccount']
+                to_account = nt['toUserAccount']
+            except KeyError:
+                continue
+            if from_account == target_wallet:
                 sol_balance_change -= amount
-            elif nt.get('toUserAccount') == self.target_wallet:
+            elif to_account == target_wallet:
                 sol_balance_change += amount
         
         # 转换为 SOL（lamports 转 SOL）
@@ -424,43 +503,195 @@ class TokenAttributionCalculator:
         if abs(sol_change) < 1e-9:
             return buy_attributions, sell_attributions
         
-        # 分离买入和卖出
-        buys = {mint: amt for mint, amt in token_changes.items() if amt > 0}
-        sells = {mint: abs(amt) for mint, amt in token_changes.items() if amt < 0}
+        # 一次遍历累计买入/卖出总量，不再先拆出 buys/sells 两个中间字典
+        total_buy_tokens = 0.0
+        total_sell_tokens = 0.0
+        for amt in token_changes.values():
+            if amt > 0:
+                total_buy_tokens += amt
+            elif amt < 0:
+                total_sell_tokens -= amt
         
+        # 按 SOL 方向只分配一侧
         if sol_change < 0:  # 支出 SOL -> 买入成本
-            total_buy_tokens = sum(buys.values())
             if total_buy_tokens > 0:
-                cost_per_token = abs(sol_change) / total_buy_tokens
-                for mint, token_amount in buys.items():
-                    buy_attributions[mint] = cost_per_token * token_amount
+                cost_per_token = -sol_change / total_buy_tokens
+                buy_attributions = {
+                    mint: cost_per_token * amt for mint, amt in token_changes.items() if amt > 0
+                }
         
-        elif sol_change > 0:  # 收入 SOL -> 卖出收益
-            total_sell_tokens = sum(sells.values())
-            if total_sell_tokens > 0:
-                proceeds_per_token = sol_change / total_sell_tokens
-                for mint, token_amount in sells.items():
-                    sell_attributions[mint] = proceeds_per_token * token_amount
+        elif total_sell_tokens > 0:  # 收入 SOL -> 卖出收益
+            proceeds_per_token = sol_change / total_sell_tokens
+            sell_attributions = {
+                mint: proceeds_per_token * -amt for mint, amt in token_changes.items() if amt < 0
+            }
         
         return buy_attributions, sell_attributions
 
 
+class ProjectTransactions:
+    """
+    代币项目的逐笔交易记录（列式存储）
+    
+    每个字段一列 array，代替逐笔字典列表：内存占用更小，按列扫描（max/any/过滤）也更快
+    """
+    
+    __slots__ = ("timestamps", "sol_changes", "token_deltas", "buy_sols", "sell_sols")
+    
+    def __init__(self):
+        self.timestamps = array('q')  # 交易时间戳（秒）
+        self.sol_changes = array('d')  # 该笔交易的 SOL 净变动
+        self.token_deltas = array('d')  # 该代币的数量变动
+        self.buy_sols = array('d')  # 归因到该代币的买入成本
+        self.sell_sols = array('d')  # 归因到该代币的卖出收益
+    
+    def append(self, timestamp: int, sol_change: float, token_delta: float, buy_sol: float, sell_sol: float):
+        """
+        追加一笔交易记录
+        
+        Args:
+            timestamp: 交易时间戳（秒）
+            sol_change: SOL 净变动
+            token_delta: 代币数量变动
+            buy_sol: 买入成本归因
+            sell_sol: 卖出收益归因
+        """
+        self.timestamps.append(timestamp)
+        self.sol_changes.append(sol_change)
+        self.token_deltas.append(token_delta)
+        self.buy_sols.append(buy_sol)
+        self.sell_sols.append(sell_sol)
+    
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+
+class TokenProject:
+    """
+    单个代币项目的累计数据（解析阶段的累加器）
+    
+    使用 __slots__ 固定属性，替代逐代币的多键字典：每个项目只分配一个小对象，
+    热循环中按属性读写，不必对 mint 反复做字典查找
+    """
+    
+    __slots__ = (
+        "buy_sol", "sell_sol", "buy_tokens", "sell_tokens",
+        "hold_periods", "current_position", "current_period_start",
+        "transactions", "buy_count", "sell_count",
+    )
+    
+    def __init__(self):
+        self.buy_sol = 0.0
+        self.sell_sol = 0.0
+        self.buy_tokens = 0.0
+        self.sell_tokens = 0.0
+        self.hold_periods = []  # 持仓周期列表：[[start_time, end_time], ...]
+        self.current_position = 0.0  # 当前持仓数量
+        self.current_period_start = 0  # 当前持仓周期的开始时间
+        self.transactions = ProjectTransactions()  # 记录每笔交易的详细信息（列式）
+        self.buy_count = 0  # 买入次数
+        self.sell_count = 0  # 卖出次数
+
+
+class TokenResult:
+    """
+    单个代币项目的分析结果（parse_token_projects 的输出记录）
+    
+    使用 __slots__ 固定字段，替代逐代币的结果字典：评分和报表按属性读取，
+    不必对每个字段做字典查找，内存占用也更小
+    """
+    
+    __slots__ = (
+        "token", "cost", "profit", "roi", "is_win", "hold_time",
+        "first_time", "last_time", "transactions", "has_price",
+        "remaining_tokens", "unrealized_sol", "unsettled_cost", "is_unsettled",
+        "buy_count", "sell_count",
+    )
+    
+    def __init__(
+        self,
+        token: str,
+        cost: float,
+        profit: float,
+        roi: float,
+        hold_time: float,
+        first_time: int,
+        last_time: int,
+        transactions: ProjectTransactions,
+        has_price: bool,
+        remaining_tokens: float,
+        unrealized_sol: float,
+        unsettled_cost: float,
+        buy_count: int,
+        sell_count: int
+    ):
+        self.token = token
+        self.cost = cost
+        self.profit = profit
+        self.roi = roi
+        self.is_win = profit > 0
+        self.hold_time = hold_time  # 持仓时间（分钟）
+        self.first_time = first_time
+        self.last_time = last_time
+        self.transactions = transactions
+        self.has_price = has_price
+        self.remaining_tokens = remaining_tokens  # 剩余代币数量
+        self.unrealized_sol = unrealized_sol  # 未实现收益（SOL）
+        self.unsettled_cost = unsettled_cost  # 未结算部分的成本
+        self.is_unsettled = remaining_tokens > 0  # 是否未结算
+        self.buy_count = buy_count  # 买入次数
+        self.sell_count = sell_count  # 卖出次数
+
+
 class PriceFetcher:
     """
     价格获取器：负责获取代币价格（直接获取 SOL 价格）
     """
     
-    def __init__(self, session: aiohttp.ClientSession, jupiter_api_key: str = None):
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        jupiter_api_key: str = None,
+        price_cache: Optional[Dict[str, Tuple[float, float]]] = None,
+        inflight: Optional[Dict[str, asyncio.Future]] = None
+    ):
         """
         初始化价格获取器
         
         Args:
             session: aiohttp 会话对象
             jupiter_api_key: Jupiter API 密钥（可选）
+            price_cache: 共享价格缓存 {mint: (price_sol, 缓存时间)}（可选，不传则仅本实例使用）
+            inflight: 共享的查询中代币 {mint: Future}（可选），用于合并并发的重复查询
         """
         self.session = session
         self.jupiter_api_key = jupiter_api_key or JUPITER_API_KEY
-        self._price_cache: Dict[str, float] = {}
+        self._price_cache = price_cache if price_cache is not None else {}
+        self._inflight = inflight if inflight is not None else {}
+        
+        # 请求头和超时在实例生命周期内不变，只构造一次
+        self._jupiter_headers = {"Accept": "application/json"}
+        if self.jupiter_api_key:
+            self._jupiter_headers["x-api-key"] = self.jupiter_api_key
+        self._jupiter_timeout = aiohttp.ClientTimeout(total=JUPITER_QUOTE_TIMEOUT)
+    
+    def _get_cached_price(self, mint: str) -> Optional[float]:
+        """
+        读取未过期的缓存价格
+        
+        Args:
+            mint: 代币地址
+            
+        Returns:
+            缓存的 SOL 价格，未缓存或已过期返回 None
+        """
+        entry = self._price_cache.get(mint)
+        if entry is None:
+            return None
+        price, cached_at = entry
+        if time.monotonic() - cached_at > PRICE_CACHE_TTL:
+            return None
+        return price
     
     async def get_token_prices_in_sol(
         self,
@@ -485,35 +716,133 @@ class PriceFetcher:
 
         # 优化：先查询缓存中已有的，减少API调用
         cached_prices = {}
+        pending = {}  # 其它钱包正在查询的代币：直接等待其结果，不重复请求
         uncached_mints = []
         for mint in mints_list:
-            if mint in self._price_cache:
-                cached_prices[mint] = self._price_cache[mint]
+            price = self._get_cached_price(mint)
+            if price is not None:
+                cached_prices[mint] = price
+            elif mint in self._inflight:
+                pending[mint] = self._inflight[mint]
             else:
                 uncached_mints.append(mint)
 
-        # 只对未缓存的代币进行API查询（串行，因为API不能并发）
-        # 添加超时保护：如果代币太多，限制查询时间
-        max_price_queries = 30  # 最多查询30个代币的价格（减少以提升速度）
-        if len(uncached_mints) > max_price_queries:
-            logger.info(f"未缓存代币过多({len(uncached_mints)}个)，仅查询前{max_price_queries}个以提升速度")
-            uncached_mints = uncached_mints[:max_price_queries]
-        
-        for i, mint in enumerate(uncached_mints):
-            try:
-                result = await self._get_single_token_price_sol(mint, max_retries)
-                if result is not None and result > 0:
-                    prices[mint] = result
-                    self._price_cache[mint] = result
-            except Exception as e:
-                logger.debug(f"获取 {mint[:8]}... 价格失败: {e}")
-                continue
+        # 登记由本次调用负责查询的代币（single-flight），查询结束后统一发布结果
+        loop = asyncio.get_running_loop()
+        owned = {mint: loop.create_future() for mint in uncached_mints}
+        self._inflight.update(owned)
+        try:
+            # 先用批量价格接口一次查询多个代币，未命中的再逐个询价
+            if uncached_mints:
+                batch_prices = await self._get_batch_prices_sol(uncached_mints, max_retries)
+                if batch_prices:
+                    prices.update(batch_prices)
+                    now = time.monotonic()
+                    for mint, price in batch_prices.items():
+                        self._price_cache[mint] = (price, now)
+                    uncached_mints = [mint for mint in uncached_mints if mint not in batch_prices]
+
+            # 只对未缓存的代币进行API查询（串行，因为API不能并发）
+            # 添加超时保护：如果代币太多，限制查询时间
+            max_price_queries = 30  # 最多查询30个代币的价格（减少以提升速度）
+            if len(uncached_mints) > max_price_queries:
+                logger.info(f"未缓存代币过多({len(uncached_mints)}个)，仅查询前{max_price_queries}个以提升速度")
+                uncached_mints = uncached_mints[:max_price_queries]
+
+            for i, mint in enumerate(uncached_mints):
+                try:
+                    result = await self._get_single_token_price_sol(mint, max_retries)
+                    if result is not None and result > 0:
+                        prices[mint] = result
+                        self._price_cache[mint] = (result, time.monotonic())
+                except Exception as e:
+                    logger.debug(f"获取 {mint[:8]}... 价格失败: {e}")
+                    continue
+        finally:
+            for mint, future in owned.items():
+                if self._inflight.get(mint) is future:
+                    del self._inflight[mint]
+                if not future.done():
+                    future.set_result(prices.get(mint))
+
+        # 等待其它钱包查询中的代币（shield：本协程被取消时不影响共享的 Future）
+        for mint, future in pending.items():
+            price = await asyncio.shield(future)
+            if price:
+                prices[mint] = price
 
         # 合并缓存和查询结果
         prices.update(cached_prices)
         
         return prices
     
+    async def _get_batch_prices_sol(
+        self,
+        token_mints: List[str],
+        max_retries: int
+    ) -> Dict[str, float]:
+        """
+        通过 Jupiter 批量价格接口获取多个代币对 SOL 的价格
+        
+        接口返回 USD 价格，每批附带 WSOL 一起查询，用 代币USD价格 / SOL USD价格 换算
+        
+        Args:
+            token_mints: 代币地址列表（已去重）
+            max_retries: 最大重试次数
+            
+        Returns:
+            价格字典 {mint: price_sol}，查询失败或无价格的代币不在其中
+        """
+        prices = {}
+        headers = self._jupiter_headers
+        timeout = self._jupiter_timeout
+        chunk_size = JUPITER_PRICE_BATCH_SIZE - 1  # 每批预留一个位置给 WSOL
+        
+        for start in range(0, len(token_mints), chunk_size):
+            chunk = token_mints[start:start + chunk_size]
+            params = {"ids": ",".join([WSOL_MINT, *chunk])}
+            
+            data = None
+            for attempt in range(max_retries):
+                try:
+                    async with self.session.get(JUPITER_PRICE_URL, params=params, headers=headers, timeout=timeout) as resp:
+                        if resp.status == 200:
+                            data = orjson.loads(await resp.read())
+                            break
+                        if resp.status == 429:
+                            wait_time = rate_limit_delay(resp.headers.get('Retry-After'), attempt + 1)
+                            logger.warning(f"Jupiter price API rate limited (429), waiting {wait_time:.1f}s before retry")
+                            await asyncio.sleep(wait_time)
+                            continue
+                        logger.debug(f"Jupiter price API returned status {resp.status}")
+                except asyncio.TimeoutError:
+                    logger.debug("Jupiter price API timeout")
+                except Exception as e:
+                    logger.debug(f"Jupiter price API error: {e}")
+            
+            if not isinstance(data, dict):
+                continue
+            
+            sol_info = data.get(WSOL_MINT)
+            sol_usd = sol_info.get('usdPrice') if isinstance(sol_info, dict) else None
+            if not sol_usd or sol_usd <= 0:
+                continue
+            
+            for mint in chunk:
+                if mint == WSOL_MINT:
+                    prices[mint] = 1.0
+                    continue
+                info = data.get(mint)
+                usd_price = info.get('usdPrice') if isinstance(info, dict) else None
+                if not usd_price or usd_price <= 0:
+                    continue
+                price_sol = usd_price / sol_usd
+                # 与逐个询价使用相同的合理区间
+                if 0.000001 <= price_sol <= 1000:
+                    prices[mint] = price_sol
+        
+        return prices
+    
     async def _get_single_token_price_sol(
         self,
         token_mint: str,
@@ -530,8 +859,9 @@ class PriceFetcher:
             代币的 SOL 价格，失败返回 None
         """
         # 检查缓存
-        if token_mint in self._price_cache:
-            return self._price_cache[token_mint]
+        cached_price = self._get_cached_price(token_mint)
+        if cached_price is not None:
+            return cached_price
         
         # 如果是 WSOL，直接返回 1
         if token_mint == WSOL_MINT:
@@ -545,11 +875,8 @@ class PriceFetcher:
         ]
         
         url = "https://api.jup.ag/swap/v1/quote"
-        headers = {"Accept": "application/json"}
-        if self.jupiter_api_key:
-            headers["x-api-key"] = self.jupiter_api_key
-        
-        timeout = aiohttp.ClientTimeout(total=JUPITER_QUOTE_TIMEOUT)
+        headers = self._jupiter_headers
+        timeout = self._jupiter_timeout
         
         for quote_idx, quote_amount in enumerate(test_amounts):
             params = {
@@ -564,7 +891,7 @@ class PriceFetcher:
                 try:
                     async with self.session.get(url, params=params, headers=headers, timeout=timeout) as resp:
                         if resp.status == 200:
-                            data = await resp.json()
+                            data = orjson.loads(await resp.read())
                             out_amount = int(data.get('outAmount', 0))
                             if out_amount > 0:
                                 decimals = 6 if quote_amount == int(1e6) else (9 if quote_amount == int(1e9) else 8)
@@ -574,17 +901,9 @@ class PriceFetcher:
                             # out_amount为0，尝试下一个quote_amount
                             break
                         elif resp.status == 429:
-                            # 429错误：尝试读取Retry-After头，否则使用指数退避
-                            retry_after = resp.headers.get('Retry-After')
-                            if retry_after:
-                                try:
-                                    wait_time = float(retry_after)
-                                except (ValueError, TypeError):
-                                    wait_time = min((attempt + 1) * 2, 60)  # 最多等待60秒
-                            else:
-                                # 指数退避：2秒、4秒、8秒...最多60秒
-                                wait_time = min(2 ** (attempt + 1), 60)
-                            logger.warning(f"Jupiter API rate limited (429), waiting {wait_time}s before retry")
+                            # 429错误：优先遵循 Retry-After 头，否则使用带抖动的指数退避
+                            wait_time = rate_limit_delay(resp.headers.get('Retry-After'), attempt + 1)
+                            logger.warning(f"Jupiter API rate limited (429), waiting {wait_time:.1f}s before retry")
                             await asyncio.sleep(wait_time)
                             continue
                         else:
@@ -634,6 +953,9 @@ class WalletAnalyzerV2:
         if not self.helius_api_key:
             raise ValueError("HELIUS_API_KEY 未配置")
         self.db_manager = db_manager
+        # 跨钱包共享的代币价格缓存与查询中的代币（热门代币在批量分析中只查询一次）
+        self.price_cache: Dict[str, Tuple[float, float]] = {}
+        self._price_inflight: Dict[str, asyncio.Future] = {}
     
     async def fetch_history_pagination(
         self,
@@ -724,17 +1046,9 @@ class WalletAnalyzerV2:
                             if retry_count > max_retries:
                                 logger.warning(f"Helius API rate limit exceeded after {max_retries} retries, stopping at {len(new_txs)} transactions")
                                 break
-                            # 尝试读取Retry-After头，否则使用指数退避
-                            retry_after = resp.headers.get('Retry-After')
-                            if retry_after:
-                                try:
-                                    wait_time = float(retry_after)
-                                except (ValueError, TypeError):
-                                    wait_time = min(retry_count * 2, 60)  # 最多等待60秒
-                            else:
-                                # 指数退避：2秒、4秒、8秒...最多60秒
-                                wait_time = min(2 ** retry_count, 60)
-                            logger.warning(f"Helius API rate limited (429), waiting {wait_time}s before retry ({retry_count}/{max_retries})")
+                            # 优先遵循 Retry-After 头，否则使用带抖动的指数退避
+                            wait_time = rate_limit_delay(resp.headers.get('Retry-After'), retry_count)
+                            logger.warning(f"Helius API rate limited (429), waiting {wait_time:.1f}s before retry ({retry_count}/{max_retries})")
                             await asyncio.sleep(wait_time)
                             continue
 
@@ -742,7 +1056,7 @@ class WalletAnalyzerV2:
                             logger.warning(f"Helius API returned status {resp.status}, stopping")
                             break
 
-                        data = await resp.json()
+                        data = orjson.loads(await resp.read())
                         if not data:
                             break
 
@@ -812,22 +1126,15 @@ class WalletAnalyzerV2:
                                         retry_count += 1
                                         if retry_count > max_retries:
                                             break
-                                        retry_after = resp.headers.get('Retry-After')
-                                        if retry_after:
-                                            try:
-                                                wait_time = float(retry_after)
-                                            except (ValueError, TypeError):
-                                                wait_time = min(retry_count * 2, 60)
-                                        else:
-                                            wait_time = min(2 ** retry_count, 60)
-                                        logger.warning(f"Helius API rate limited (429), waiting {wait_time}s")
+                                        wait_time = rate_limit_delay(resp.headers.get('Retry-After'), retry_count)
+                                        logger.warning(f"Helius API rate limited (429), waiting {wait_time:.1f}s")
                                         await asyncio.sleep(wait_time)
                                         continue
                                     
                                     if resp.status != 200:
                                         break
                                     
-                                    data = await resp.json()
+                                    data = orjson.loads(await resp.read())
                                     if not data:
                                         break
                                     
@@ -891,28 +1198,17 @@ class WalletAnalyzerV2:
             target_wallet: 目标钱包地址
             
         Returns:
-            分析结果字典，包含详细指标
+            分析结果字典：results 为 TokenResult 列表，prices 为代币价格（SOL）
         """
         # 初始化组件
         parser = TransactionParser(target_wallet)
         attribution_calc = TokenAttributionCalculator()
-        price_fetcher = PriceFetcher(session)
+        price_fetcher = PriceFetcher(session, price_cache=self.price_cache, inflight=self._price_inflight)
         
-        # 项目数据：{mint: {buy_sol, sell_sol, buy_tokens, sell_tokens, hold_periods, transactions}}
+        # 项目数据：{mint: TokenProject}
         # hold_periods: 持仓周期列表，每个周期包含 [start_time, end_time]
         # 用于正确计算持仓时间（同一代币可能有多个交易周期）
-        projects = defaultdict(lambda: {
-            "buy_sol": 0.0,
-            "sell_sol": 0.0,
-            "buy_tokens": 0.0,
-            "sell_tokens": 0.0,
-            "hold_periods": [],  # 持仓周期列表：[[start_time, end_time], ...]
-            "current_position": 0.0,  # 当前持仓数量
-            "current_period_start": 0,  # 当前持仓周期的开始时间
-            "transactions": [],  # 记录每笔交易的详细信息
-            "buy_count": 0,  # 买入次数
-            "sell_count": 0  # 卖出次数
-        })
+        projects: Dict[str, TokenProject] = {}
         
         # 按时间正序处理交易（从最早到最新），这样才能正确跟踪持仓状态
         # 注意：transactions 可能是倒序的（最新的在前），需要先排序
@@ -925,6 +1221,9 @@ class WalletAnalyzerV2:
             try:
                 # 解析交易
                 sol_change, token_changes, timestamp = parser.parse_transaction(tx)
+                # 没有代币变动（如单纯的包装/解包 SOL）的交易不影响任何项目，无需归因
+                if not token_changes:
+                    continue
                 
                 # 计算归因
                 buy_attributions, sell_attributions = attribution_calc.calculate_attribution(
@@ -932,91 +1231,64 @@ class WalletAnalyzerV2:
                 )
                 
                 # 更新项目数据
+                # 无 SOL 的跨代币兑换也在这里计入代币数量（此时归因为 0），不能再单独累加一遍
                 for mint, delta in token_changes.items():
                     # 跳过 delta 为 0 的情况（同一笔交易中买入和卖出数量相等）
                     if abs(delta) < 1e-9:
                         continue
                     
+                    # 每个代币只查找一次项目，首次出现时才创建
+                    project = projects.get(mint)
+                    if project is None:
+                        project = projects[mint] = TokenProject()
+                    
                     # 更新代币数量
                     if delta > 0:
-                        projects[mint]["buy_tokens"] += delta
+                        project.buy_tokens += delta
                     else:
-                        projects[mint]["sell_tokens"] += abs(delta)
+                        project.sell_tokens -= delta
                     
                     # 更新 SOL 成本/收益
-                    if mint in buy_attributions:
-                        projects[mint]["buy_sol"] += buy_attributions[mint]
+                    buy_sol = buy_attributions.get(mint, 0.0)
+                    sell_sol = sell_attributions.get(mint, 0.0)
+                    if buy_sol:
+                        project.buy_sol += buy_sol
                         # 统计买入次数（只有当买入金额大于0时才计数）
-                        if buy_attributions[mint] > 1e-9:
-                            projects[mint]["buy_count"] += 1
-                    if mint in sell_attributions:
-                        projects[mint]["sell_sol"] += sell_attributions[mint]
+                        if buy_sol > 1e-9:
+                            project.buy_count += 1
+                    if sell_sol:
+                        project.sell_sol += sell_sol
                         # 统计卖出次数（只有当卖出金额大于0时才计数）
-                        if sell_attributions[mint] > 1e-9:
-                            projects[mint]["sell_count"] += 1
+                        if sell_sol > 1e-9:
+                            project.sell_count += 1
                     
                     # 跟踪持仓周期（用于正确计算持仓时间）
-                    prev_position = projects[mint]["current_position"]
+                    prev_position = project.current_position
                     new_position = prev_position + delta
-                    projects[mint]["current_position"] = new_position
+                    project.current_position = new_position
                     
                     # 如果持仓从0变为>0，开始新的持仓周期
                     if prev_position == 0 and new_position > 0 and timestamp > 0:
-                        projects[mint]["current_period_start"] = timestamp
+                        project.current_period_start = timestamp
                     
                     # 如果持仓从>0变为0，结束当前持仓周期
                     elif prev_position > 0 and new_position == 0 and timestamp > 0:
-                        period_start = projects[mint]["current_period_start"]
+                        period_start = project.current_period_start
                         if period_start > 0:
                             # 如果开始时间和结束时间相同（同一笔交易中买入并卖出），至少记录1秒的持仓时间
                             end_time = timestamp
                             if end_time <= period_start:
                                 end_time = period_start + 1  # 至少1秒
-                            projects[mint]["hold_periods"].append([period_start, end_time])
-                            projects[mint]["current_period_start"] = 0
+                            project.hold_periods.append([period_start, end_time])
+                            project.current_period_start = 0
                     
                     # 特殊情况：如果同一笔交易中同时买入和卖出（delta 可能很小但不为0）
                     # 这种情况下，如果持仓从0变为>0再变为0，需要特殊处理
                     # 但这种情况已经在上面处理了，因为我们会先处理买入（delta > 0），再处理卖出（delta < 0）
                     
                     # 记录交易详情
-                    projects[mint]["transactions"].append({
-                        "timestamp": timestamp,
-                        "sol_change": sol_change,
-                        "token_delta": delta,
-                        "buy_sol": buy_attributions.get(mint, 0),
-                        "sell_sol": sell_attributions.get(mint, 0)
-                    })
+                    project.transactions.append(timestamp, sol_change, delta, buy_sol, sell_sol)
                 
-                # 处理无 SOL 交易的跨代币兑换
-                # 注意：跨代币兑换也需要更新持仓周期
-                if abs(sol_change) < 1e-9 and token_changes:
-                    for mint, delta in token_changes.items():
-                        if delta > 0:
-                            projects[mint]["buy_tokens"] += delta
-                        else:
-                            projects[mint]["sell_tokens"] += abs(delta)
-                        
-                        # 跟踪持仓周期（与上面相同的逻辑）
-                        prev_position = projects[mint]["current_position"]
-                        new_position = prev_position + delta
-                        projects[mint]["current_position"] = new_position
-                        
-                        # 如果持仓从0变为>0，开始新的持仓周期
-                        if prev_position == 0 and new_position > 0 and timestamp > 0:
-                            projects[mint]["current_period_start"] = timestamp
-                        
-                        # 如果持仓从>0变为0，结束当前持仓周期
-                        elif prev_position > 0 and new_position == 0 and timestamp > 0:
-                            period_start = projects[mint]["current_period_start"]
-                            if period_start > 0:
-                                # 如果开始时间和结束时间相同（同一笔交易中买入并卖出），至少记录1秒的持仓时间
-                                end_time = timestamp
-                                if end_time <= period_start:
-                                    end_time = period_start + 1  # 至少1秒
-                                projects[mint]["hold_periods"].append([period_start, end_time])
-                                projects[mint]["current_period_start"] = 0
-                            
             except Exception as e:
                 logger.warning(f"Error parsing transaction: {e}")
                 continue
@@ -1024,7 +1296,7 @@ class WalletAnalyzerV2:
         # 获取当前价格并计算最终收益
         active_mints = [
             m for m, v in projects.items()
-            if (v["buy_tokens"] - v["sell_tokens"]) > 0 and v["buy_sol"] >= MIN_COST_THRESHOLD
+            if (v.buy_tokens - v.sell_tokens) > 0 and v.buy_sol >= MIN_COST_THRESHOLD
         ]
         
         # 优化：如果持仓代币太多，只查询前30个（避免查询时间过长）
@@ -1042,10 +1314,10 @@ class WalletAnalyzerV2:
         # 生成最终结果
         final_results = []
         for mint, data in projects.items():
-            if data["buy_sol"] < MIN_COST_THRESHOLD:
+            if data.buy_sol < MIN_COST_THRESHOLD:
                 continue
             
-            remaining_tokens = max(0.0, data["buy_tokens"] - data["sell_tokens"])
+            remaining_tokens = max(0.0, data.buy_tokens - data.sell_tokens)
             price_sol = prices_sol.get(mint, 0)
             
             # 计算收益
@@ -1054,15 +1326,15 @@ class WalletAnalyzerV2:
             else:
                 unrealized_sol = remaining_tokens * price_sol
             
-            total_value_sol = data["sell_sol"] + unrealized_sol
-            net_profit = total_value_sol - data["buy_sol"]
-            roi = (total_value_sol / data["buy_sol"] - 1) if data["buy_sol"] > 0 else 0
+            total_value_sol = data.sell_sol + unrealized_sol
+            net_profit = total_value_sol - data.buy_sol
+            roi = (total_value_sol / data.buy_sol - 1) if data.buy_sol > 0 else 0
             
             # 计算持仓时间（累加所有持仓周期的时间）
             hold_time_minutes = 0.0
-            hold_periods = data.get("hold_periods", [])
-            current_period_start = data.get("current_period_start", 0)
-            current_position = data.get("current_position", 0)
+            hold_periods = data.hold_periods
+            current_period_start = data.current_period_start
+            current_position = data.current_position
             
             # 累加已完成的持仓周期
             for period_start, period_end in hold_periods:
@@ -1078,8 +1350,8 @@ class WalletAnalyzerV2:
             # 这可能发生在最后一笔交易清仓时，current_period_start 还没有被记录到 hold_periods
             if remaining_tokens == 0 and current_period_start > 0:
                 # 从交易记录中找到最后一笔交易的时间作为结束时间
-                if data.get("transactions"):
-                    last_tx_time = max(tx.get("timestamp", 0) for tx in data["transactions"])
+                if data.transactions:
+                    last_tx_time = max(data.transactions.timestamps)
                     if last_tx_time >= current_period_start:  # 使用 >= 而不是 >，允许相同时间
                         # 如果开始时间和结束时间相同，至少记录1秒的持仓时间
                         end_time = last_tx_time
@@ -1093,13 +1365,14 @@ class WalletAnalyzerV2:
             
             # 如果持仓时间为0，但代币有交易记录，说明可能是同一笔交易中买入并卖出
             # 这种情况下，至少应该记录一个很小的持仓时间（比如1秒）
-            if hold_time_minutes == 0 and data.get("transactions") and len(data["transactions"]) > 0:
+            if hold_time_minutes == 0 and data.transactions:
                 # 检查是否有买入和卖出
-                has_buy = any(tx.get("token_delta", 0) > 0 for tx in data["transactions"])
-                has_sell = any(tx.get("token_delta", 0) < 0 for tx in data["transactions"])
+                token_deltas = data.transactions.token_deltas
+                has_buy = any(d > 0 for d in token_deltas)
+                has_sell = any(d < 0 for d in token_deltas)
                 if has_buy and has_sell:
                     # 同一代币有买入和卖出，至少记录1秒的持仓时间
-                    tx_times = [tx.get("timestamp", 0) for tx in data["transactions"] if tx.get("timestamp", 0) > 0]
+                    tx_times = [t for t in data.transactions.timestamps if t > 0]
                     if tx_times:
                         min_time = min(tx_times)
                         max_time = max(tx_times)
@@ -1126,8 +1399,8 @@ class WalletAnalyzerV2:
             
             # 如果所有持仓周期都已结束，但从交易记录中获取时间范围（作为后备方案）
             # 这确保 first_time 和 last_time 总是有值（用于时间窗口分析）
-            if data.get("transactions"):
-                tx_times = [tx.get("timestamp", 0) for tx in data["transactions"] if tx.get("timestamp", 0) > 0]
+            if data.transactions:
+                tx_times = [t for t in data.transactions.timestamps if t > 0]
                 if tx_times:
                     tx_first = min(tx_times)
                     tx_last = max(tx_times)
@@ -1143,27 +1416,25 @@ class WalletAnalyzerV2:
             
             # 计算未结算部分的成本（按比例分配）
             unsettled_cost = 0.0
-            if remaining_tokens > 0 and data["buy_tokens"] > 0:
-                unsettled_cost = data["buy_sol"] * (remaining_tokens / data["buy_tokens"])
+            if remaining_tokens > 0 and data.buy_tokens > 0:
+                unsettled_cost = data.buy_sol * (remaining_tokens / data.buy_tokens)
             
-            final_results.append({
-                "token": mint,
-                "cost": data["buy_sol"],
-                "profit": net_profit,
-                "roi": roi,
-                "is_win": net_profit > 0,
-                "hold_time": hold_time_minutes,
-                "first_time": first_time,  # 使用计算出的 first_time
-                "last_time": last_time,  # 使用计算出的 last_time
-                "transactions": data["transactions"],
-                "has_price": price_sol > 0,
-                "remaining_tokens": remaining_tokens,  # 剩余代币数量
-                "unrealized_sol": unrealized_sol,  # 未实现收益（SOL）
-                "unsettled_cost": unsettled_cost,  # 未结算部分的成本
-                "is_unsettled": remaining_tokens > 0,  # 是否未结算
-                "buy_count": data.get("buy_count", 0),  # 买入次数
-                "sell_count": data.get("sell_count", 0)  # 卖出次数
-            })
+            final_results.append(TokenResult(
+                token=mint,
+                cost=data.buy_sol,
+                profit=net_profit,
+                roi=roi,
+                hold_time=hold_time_minutes,
+                first_time=first_time,  # 使用计算出的 first_time
+                last_time=last_time,  # 使用计算出的 last_time
+                transactions=data.transactions,
+                has_price=price_sol > 0,
+                remaining_tokens=remaining_tokens,
+                unrealized_sol=unrealized_sol,
+                unsettled_cost=unsettled_cost,
+                buy_count=data.buy_count,
+                sell_count=data.sell_count
+            ))
         
         return {
             "results": final_results,
@@ -1212,28 +1483,21 @@ class WalletScorerV2:
         time_7d = current_time - 7 * 24 * 3600
         time_30d = current_time - 30 * 24 * 3600
         
-        # 分离盈利和亏损项目
-        wins = [r for r in results if r.get('is_win', False)]
-        losses = [r for r in results if not r.get('is_win', False)]
+        # 单次遍历 results 汇总三个维度所需的全部累计量
+        stats = WalletScorerV2._collect_result_stats(results, time_7d, time_30d)
         
         # === 1. 盈利力维度 ===
-        profit_dimension = WalletScorerV2._calculate_profit_dimension(
-            results, wins, losses, time_7d, time_30d
-        )
+        profit_dimension = WalletScorerV2._calculate_profit_dimension(stats)
         
         # === 2. 持久力维度 ===
-        persistence_dimension = WalletScorerV2._calculate_persistence_dimension(
-            results, time_7d, time_30d
-        )
+        persistence_dimension = WalletScorerV2._calculate_persistence_dimension(stats)
         
         # === 3. 真实性维度 ===
-        authenticity_dimension = WalletScorerV2._calculate_authenticity_dimension(
-            results, wins, losses
-        )
+        authenticity_dimension = WalletScorerV2._calculate_authenticity_dimension(stats)
         
         # === 4. 垃圾地址识别 ===
         flags = WalletScorerV2._identify_trash_addresses(
-            results, wins, losses, profit_dimension, persistence_dimension, authenticity_dimension
+            results, profit_dimension, persistence_dimension, authenticity_dimension
         )
         
         # === 5. 计算定位 ===
@@ -1260,121 +1524,213 @@ class WalletScorerV2:
         }
     
     @staticmethod
-    def _calculate_profit_dimension(
-        results: List[dict],
-        wins: List[dict],
-        losses: List[dict],
-        time_7d: int,
-        time_30d: int
-    ) -> Dict:
+    def _median(values: List[float]) -> float:
+        """
+        计算中位数（与 statistics.median 结果一致，省去其逐值类型检查的开销）
+        
+        注意：会对 values 就地排序，调用方需在求和/求最大值之后再调用
+        
+        Args:
+            values: 非空数值列表（由调用方独占，可被修改）
+            
+        Returns:
+            中位数
+        """
+        values.sort()
+        mid = len(values) // 2
+        if len(values) % 2:
+            return values[mid]
+        return (values[mid - 1] + values[mid]) / 2
+    
+    @staticmethod
+    def _ladder_score(value: float, ladder: Tuple[Tuple[float, ...], Tuple[int, ...]]) -> int:
+        """
+        按评分阶梯查表得分（二分查找，替代逐级 if/elif）
+        
+        Args:
+            value: 待评分的指标值
+            ladder: (阈值升序元组, 得分元组)，得分比阈值多一项
+            
+        Returns:
+            该指标的得分
+        """
+        thresholds, scores = ladder
+        if value <= 0:
+            return scores[0]
+        return scores[bisect_right(thresholds, value)]
+    
+    @staticmethod
+    def _collect_result_stats(results: List[TokenResult], time_7d: int, time_30d: int) -> Dict:
+        """
+        单次遍历代币项目结果，汇总盈利力、持久力、真实性三个维度所需的累计量
+        
+        Args:
+            results: 代币项目分析结果列表
+            time_7d: 7天窗口起点（时间戳，秒）
+            time_30d: 30天窗口起点（时间戳，秒）
+            
+        Returns:
+            累计量字典
+        """
+        total_profit = 0.0
+        total_cost = 0.0
+        win_count = 0
+        win_profit = 0.0
+        loss_sum = 0.0
+        profit_7d = 0.0
+        profit_30d = 0.0
+        cost_7d = 0.0
+        cost_30d = 0.0
+        tx_count_7d = 0
+        tx_count_30d = 0
+        max_profit = 0
+        max_profit_cost = 0
+        max_profit_found = False
+        max_single_loss = 0  # 亏损项目的 ROI 必然 <= 0，从 0 开始取最小值即可
+        severe_loss_count = 0  # 亏损 >= 95% 的项目数
+        win_hold_sum = 0.0
+        win_hold_count = 0
+        loss_hold_sum = 0.0
+        loss_hold_count = 0
+        rois = []
+        hold_times = []
+        tokens = set()
+        tokens_7d = set()
+        tokens_30d = set()
+        
+        for r in results:
+            profit = r.profit
+            cost = r.cost
+            roi = r.roi
+            last_time = r.last_time
+            hold_time = r.hold_time
+            token = r.token
+            is_win = r.is_win
+            
+            total_profit += profit
+            total_cost += cost
+            rois.append(roi)
+            tokens.add(token)
+            
+            if is_win:
+                win_count += 1
+                win_profit += profit
+            else:
+                loss_sum += profit
+                if roi < max_single_loss:
+                    max_single_loss = roi
+                if roi <= -0.95:
+                    severe_loss_count += 1
+            
+            # 收益最高的代币（与 max() 一致，并列时取第一个）
+            if not max_profit_found or profit > max_profit:
+                max_profit = profit
+                max_profit_cost = cost
+                max_profit_found = True
+            
+            # 时间窗口分析（30天窗口包含7天窗口）
+            if last_time >= time_30d:
+                profit_30d += profit
+                cost_30d += cost
+                tx_count_30d += 1
+                tokens_30d.add(token)
+                if last_time >= time_7d:
+                    profit_7d += profit
+                    cost_7d += cost
+                    tx_count_7d += 1
+                    tokens_7d.add(token)
+            
+            # 持仓时间（只统计 > 0 的），按盈亏拆分
+            if hold_time > 0:
+                hold_times.append(hold_time)
+                if is_win:
+                    win_hold_sum += hold_time
+                    win_hold_count += 1
+                else:
+                    loss_hold_sum += hold_time
+                    loss_hold_count += 1
+        
+        return {
+            "count": len(results),
+            "total_profit": total_profit,
+            "total_cost": total_cost,
+            "win_count": win_count,
+            "win_profit": win_profit,
+            "loss_profit": abs(loss_sum),
+            "profit_7d": profit_7d,
+            "profit_30d": profit_30d,
+            "cost_7d": cost_7d,
+            "cost_30d": cost_30d,
+            "tx_count_7d": tx_count_7d,
+            "tx_count_30d": tx_count_30d,
+            "max_profit": max_profit,
+            "max_profit_cost": max_profit_cost,
+            "max_profit_found": max_profit_found,
+            "max_single_loss": max_single_loss,
+            "severe_loss_count": severe_loss_count,
+            "rois": rois,
+            "hold_times": hold_times,
+            "win_hold_sum": win_hold_sum,
+            "win_hold_count": win_hold_count,
+            "loss_hold_sum": loss_hold_sum,
+            "loss_hold_count": loss_hold_count,
+            "unique_tokens": len(tokens),
+            "tokens_7d": len(tokens_7d),
+            "tokens_30d": len(tokens_30d),
+        }
+    
+    @staticmethod
+    def _calculate_profit_dimension(stats: Dict) -> Dict:
         """
         计算盈利力维度
         
+        Args:
+            stats: _collect_result_stats 汇总的累计量
+            
         Returns:
             盈利力维度评分和指标
         """
-        # 基础指标
-        total_profit = sum(r.get('profit', 0) for r in results)
-        win_profit = sum(r.get('profit', 0) for r in wins)
-        loss_profit = abs(sum(r.get('profit', 0) for r in losses))
+        total_profit = stats["total_profit"]
+        win_profit = stats["win_profit"]
+        loss_profit = stats["loss_profit"]
+        profit_7d = stats["profit_7d"]
+        profit_30d = stats["profit_30d"]
+        cost_7d = stats["cost_7d"]
+        cost_30d = stats["cost_30d"]
+        max_single_loss = stats["max_single_loss"]
+        rois = stats["rois"]
+        
         profit_factor = win_profit / loss_profit if loss_profit > 0 else (win_profit if win_profit > 0 else 0)
         
         # 计算排除最高收益代币后的盈利（更能反映持续盈利能力）
-        if results:
-            # 找到收益最高的代币
-            max_profit_result = max(results, key=lambda x: x.get('profit', 0))
-            max_profit = max_profit_result.get('profit', 0)
-            max_profit_cost = max_profit_result.get('cost', 0)
-            
-            # 排除最高收益代币后的总盈利和总成本
-            profit_excluding_max = total_profit - max_profit
-            total_cost = sum(r.get('cost', 0) for r in results)
-            cost_excluding_max = total_cost - max_profit_cost
-            
-            # 排除最高收益后的盈利百分比
+        if stats["max_profit_found"]:
+            profit_excluding_max = total_profit - stats["max_profit"]
+            cost_excluding_max = stats["total_cost"] - stats["max_profit_cost"]
             profit_pct_excluding_max = (
                     profit_excluding_max / cost_excluding_max * 100) if cost_excluding_max > 0 else 0
         else:
             profit_pct_excluding_max = 0
-            max_profit = 0
-        
-        # 时间窗口分析
-        results_7d = [r for r in results if r.get('last_time', 0) >= time_7d]
-        results_30d = [r for r in results if r.get('last_time', 0) >= time_30d]
-        
-        profit_7d = sum(r.get('profit', 0) for r in results_7d)
-        profit_30d = sum(r.get('profit', 0) for r in results_30d)
-        
-        # 计算百分比（相对于总成本）
-        total_cost = sum(r.get('cost', 0) for r in results)
-        cost_7d = sum(r.get('cost', 0) for r in results_7d)
-        cost_30d = sum(r.get('cost', 0) for r in results_30d)
         
+        # 计算百分比（相对于时间窗口内的成本）
         profit_pct_7d = (profit_7d / cost_7d * 100) if cost_7d > 0 else 0
         profit_pct_30d = (profit_30d / cost_30d * 100) if cost_30d > 0 else 0
         
         # 单币ROI统计
-        rois = [r.get('roi', 0) for r in results]
         max_roi = max(rois) if rois else 0
-        avg_roi = statistics.mean(rois) if rois else 0
-        median_roi = statistics.median(rois) if rois else 0
-        
-        # 最大单笔亏损
-        max_single_loss = min([r.get('roi', 0) for r in losses]) if losses else 0
+        avg_roi = sum(rois) / len(rois) if rois else 0
+        median_roi = WalletScorerV2._median(rois) if rois else 0
         
         # 盈利力评分（0-100）
-        profit_score = 0
-        
-        # 盈亏比评分（30分）
-        if profit_factor >= 5:
-            profit_score += 30
-        elif profit_factor >= 3:
-            profit_score += 25
-        elif profit_factor >= 2:
-            profit_score += 20
-        elif profit_factor >= 1.5:
-            profit_score += 15
-        elif profit_factor >= 1:
-            profit_score += 10
-        elif profit_factor > 0:
-            profit_score += 5
-        
-        # 30天盈利评分（30分）- 按百分比计算
-        if profit_pct_30d >= 100:  # >= 100%
-            profit_score += 30
-        elif profit_pct_30d >= 80:
-            profit_score += 25
-        elif profit_pct_30d >= 50:
-            profit_score += 20
-        elif profit_pct_30d >= 30:
-            profit_score += 15
-        elif profit_pct_30d >= 10:
-            profit_score += 10
-        elif profit_pct_30d > 0:
-            profit_score += 5
-        
-        # 7天盈利评分（20分）- 按百分比计算
-        if profit_pct_7d >= 30:  # >= 30%
-            profit_score += 20
-        elif profit_pct_7d >= 20:
-            profit_score += 15
-        elif profit_pct_7d >= 10:
-            profit_score += 10
-        elif profit_pct_7d > 0:
-            profit_score += 5
-        
-        # 单币ROI评分（20分）
-        if max_roi >= 10:  # 10倍以上
-            profit_score += 20
-        elif max_roi >= 5:
-            profit_score += 15
-        elif max_roi >= 2:
-            profit_score += 10
-        elif max_roi >= 1:
-            profit_score += 5
+        ladder_score = WalletScorerV2._ladder_score
+        profit_score = (
+            ladder_score(profit_factor, PROFIT_FACTOR_LADDER)  # 盈亏比评分（30分）
+            + ladder_score(profit_pct_30d, PROFIT_PCT_30D_LADDER)  # 30天盈利评分（30分）- 按百分比计算
+            + ladder_score(profit_pct_7d, PROFIT_PCT_7D_LADDER)  # 7天盈利评分（20分）- 按百分比计算
+            + ladder_score(max_roi, MAX_ROI_LADDER)  # 单币ROI评分（20分）
+        )
         
         return {
-            "score": min(100, profit_score),
+            "score": profit_score,
             "total_profit": total_profit,
             "profit_factor": profit_factor,
             "profit_7d": profit_7d,
@@ -1385,86 +1741,43 @@ class WalletScorerV2:
             "max_roi": max_roi,
             "avg_roi": avg_roi,
             "median_roi": median_roi,
-            "max_single_loss": max_single_loss
+            "max_single_loss": max_single_loss,
+            "severe_loss_count": stats["severe_loss_count"]
         }
     
     @staticmethod
-    def _calculate_persistence_dimension(
-        results: List[dict],
-        time_7d: int,
-        time_30d: int
-    ) -> Dict:
+    def _calculate_persistence_dimension(stats: Dict) -> Dict:
         """
         计算持久力维度
         
+        Args:
+            stats: _collect_result_stats 汇总的累计量
+            
         Returns:
             持久力维度评分和指标
         """
         # 基础胜率
-        wins = [r for r in results if r.get('is_win', False)]
-        win_rate = len(wins) / len(results) if results else 0
+        count = stats["count"]
+        win_count = stats["win_count"]
+        win_rate = win_count / count if count else 0
         
-        # 时间窗口分析
-        results_7d = [r for r in results if r.get('last_time', 0) >= time_7d]
-        results_30d = [r for r in results if r.get('last_time', 0) >= time_30d]
-        
-        # 交易频次
-        tokens_7d = len(set(r.get('token', '') for r in results_7d))
-        tokens_30d = len(set(r.get('token', '') for r in results_30d))
-        tx_count_7d = len(results_7d)
-        tx_count_30d = len(results_30d)
+        # 交易频次（时间窗口内）
+        tokens_7d = stats["tokens_7d"]
+        tokens_30d = stats["tokens_30d"]
+        tx_count_7d = stats["tx_count_7d"]
+        tx_count_30d = stats["tx_count_30d"]
         
         # 持久力评分（0-100）
-        persistence_score = 0
-        
-        # 胜率评分（40分）
-        if win_rate >= 0.70:
-            persistence_score += 40
-        elif win_rate >= 0.65:
-            persistence_score += 35
-        elif win_rate >= 0.60:
-            persistence_score += 30
-        elif win_rate >= 0.55:
-            persistence_score += 25
-        elif win_rate >= 0.50:
-            persistence_score += 20
-        elif win_rate >= 0.45:
-            persistence_score += 15
-        elif win_rate >= 0.40:
-            persistence_score += 10
-        elif win_rate > 0:
-            persistence_score += 5
-        
-        # 30天交易频次评分（30分）
-        if tokens_30d >= 50:
-            persistence_score += 30
-        elif tokens_30d >= 30:
-            persistence_score += 25
-        elif tokens_30d >= 20:
-            persistence_score += 20
-        elif tokens_30d >= 10:
-            persistence_score += 15
-        elif tokens_30d >= 5:
-            persistence_score += 10
-        elif tokens_30d > 0:
-            persistence_score += 5
-        
-        # 7天交易频次评分（30分）
-        if tokens_7d >= 20:
-            persistence_score += 30
-        elif tokens_7d >= 15:
-            persistence_score += 25
-        elif tokens_7d >= 10:
-            persistence_score += 20
-        elif tokens_7d >= 5:
-            persistence_score += 15
-        elif tokens_7d >= 3:
-            persistence_score += 10
-        elif tokens_7d > 0:
-            persistence_score += 5
+        ladder_score = WalletScorerV2._ladder_score
+        persistence_score = (
+            ladder_score(win_rate, WIN_RATE_LADDER)  # 胜率评分（40分）
+            + ladder_score(tokens_30d, TOKENS_30D_LADDER)  # 30天交易频次评分（30分）
+            + ladder_score(tokens_7d, TOKENS_7D_LADDER)  # 7天交易频次评分（30分）
+        )
         
         return {
-            "score": min(100, persistence_score),
+            "score": persistence_score,
+            "win_count": win_count,
             "win_rate": win_rate,
             "tokens_7d": tokens_7d,
             "tx_count_7d": tx_count_7d,
@@ -1473,79 +1786,60 @@ class WalletScorerV2:
         }
     
     @staticmethod
-    def _calculate_authenticity_dimension(
-        results: List[dict],
-        wins: List[dict],
-        losses: List[dict]
-    ) -> Dict:
+    def _calculate_authenticity_dimension(stats: Dict) -> Dict:
         """
         计算真实性维度
         
+        Args:
+            stats: _collect_result_stats 汇总的累计量
+            
         Returns:
             真实性维度评分和指标
         """
+        hold_times = stats["hold_times"]
+        win_hold_count = stats["win_hold_count"]
+        loss_hold_count = stats["loss_hold_count"]
+        
         # 平均持仓时间
-        hold_times = [r.get('hold_time', 0) for r in results if r.get('hold_time', 0) > 0]
-        avg_hold_time = statistics.mean(hold_times) if hold_times else 0
-        median_hold_time = statistics.median(hold_times) if hold_times else 0
+        avg_hold_time = sum(hold_times) / len(hold_times) if hold_times else 0
+        median_hold_time = WalletScorerV2._median(hold_times) if hold_times else 0
         
         # 盈利代币平均持仓时间
-        win_hold_times = [r.get('hold_time', 0) for r in wins if r.get('hold_time', 0) > 0]
-        avg_win_hold_time = statistics.mean(win_hold_times) if win_hold_times else 0
+        avg_win_hold_time = stats["win_hold_sum"] / win_hold_count if win_hold_count else 0
         
         # 亏损代币平均持仓时间
-        loss_hold_times = [r.get('hold_time', 0) for r in losses if r.get('hold_time', 0) > 0]
-        avg_loss_hold_time = statistics.mean(loss_hold_times) if loss_hold_times else 0
+        avg_loss_hold_time = stats["loss_hold_sum"] / loss_hold_count if loss_hold_count else 0
         
         # 代币多样性
-        unique_tokens = len(set(r.get('token', '') for r in results))
+        unique_tokens = stats["unique_tokens"]
         
         # 真实性评分（0-100）
-        authenticity_score = 0
+        ladder_score = WalletScorerV2._ladder_score
         
         # 平均持仓时间评分（40分）- 不能太快也不能太慢
-        if 60 <= avg_hold_time <= 480:  # 1小时到8小时
-            authenticity_score += 40
-        elif 30 <= avg_hold_time <= 720:  # 30分钟到12小时
-            authenticity_score += 35
-        elif 15 <= avg_hold_time <= 1440:  # 15分钟到24小时
-            authenticity_score += 30
-        elif 5 <= avg_hold_time <= 2880:  # 5分钟到48小时
-            authenticity_score += 25
-        elif avg_hold_time > 0:
-            authenticity_score += 10
+        # 1小时~8小时 40，30分钟~12小时 35，15分钟~24小时 30，5分钟~48小时 25，其余 > 0 得 10
+        authenticity_score = 0
+        if avg_hold_time > 0:
+            band = min(
+                bisect_right(HOLD_TIME_BAND_LOWS, avg_hold_time),
+                len(HOLD_TIME_BAND_HIGHS) - bisect_left(HOLD_TIME_BAND_HIGHS, avg_hold_time)
+            )
+            authenticity_score = HOLD_TIME_BAND_SCORES[band]
         
         # 代币多样性评分（40分）
-        if unique_tokens >= 50:
-            authenticity_score += 40
-        elif unique_tokens >= 30:
-            authenticity_score += 35
-        elif unique_tokens >= 20:
-            authenticity_score += 30
-        elif unique_tokens >= 10:
-            authenticity_score += 25
-        elif unique_tokens >= 5:
-            authenticity_score += 20
-        elif unique_tokens >= 3:
-            authenticity_score += 15
-        elif unique_tokens > 1:
-            authenticity_score += 10
+        authenticity_score += ladder_score(unique_tokens, UNIQUE_TOKENS_LADDER)
         
         # 盈利/亏损持仓时间差异评分（20分）
-        # 如果盈利代币持仓时间明显长于亏损代币，说明有纪律
+        # 如果盈利代币持仓时间明显长于亏损代币，说明有纪律；差异太大则可能有问题
         if avg_win_hold_time > 0 and avg_loss_hold_time > 0:
             hold_time_ratio = avg_win_hold_time / avg_loss_hold_time
-            if 1.2 <= hold_time_ratio <= 3.0:  # 盈利持仓时间略长，说明有策略
-                authenticity_score += 20
-            elif 0.8 <= hold_time_ratio <= 1.2:  # 接近，说明一致性
-                authenticity_score += 15
-            elif hold_time_ratio > 3.0:  # 差异太大，可能有问题
-                authenticity_score += 10
+            if hold_time_ratio > HOLD_TIME_RATIO_MAX:  # 差异太大，可能有问题
+                authenticity_score += HOLD_TIME_RATIO_OVER_SCORE
             else:
-                authenticity_score += 5
+                authenticity_score += ladder_score(hold_time_ratio, HOLD_TIME_RATIO_LADDER)
         
         return {
-            "score": min(100, authenticity_score),
+            "score": authenticity_score,
             "avg_hold_time": avg_hold_time,
             "median_hold_time": median_hold_time,
             "avg_win_hold_time": avg_win_hold_time,
@@ -1555,9 +1849,7 @@ class WalletScorerV2:
     
     @staticmethod
     def _identify_trash_addresses(
-        results: List[dict],
-        wins: List[dict],
-        losses: List[dict],
+        results: List[TokenResult],
         profit_dim: Dict,
         persistence_dim: Dict,
         authenticity_dim: Dict
@@ -1573,59 +1865,59 @@ class WalletScorerV2:
             "reasons": []
         }
 
-        # 基础指标
-        win_rate = persistence_dim.get("win_rate", 0)
-        max_loss = profit_dim.get("max_single_loss", 0)
-        unique_tokens = authenticity_dim.get("unique_tokens", 0)
-        total_profit = profit_dim.get("total_profit", 0)
-        profit_factor = profit_dim.get("profit_factor", 0)
-        avg_hold_time = authenticity_dim.get("avg_hold_time", 0)
+        # 基础指标（维度字典由 _calculate_*_dimension 生成，键一定存在）
+        win_rate = persistence_dim["win_rate"]
+        max_loss = profit_dim["max_single_loss"]
+        total_profit = profit_dim["total_profit"]
+        profit_factor = profit_dim["profit_factor"]
+        unique_tokens = authenticity_dim["unique_tokens"]
+        avg_hold_time = authenticity_dim["avg_hold_time"]
+        reasons = flags["reasons"]
         
         # 1. 快枪手：平均持仓时间 < 1 分钟
         if avg_hold_time < FAST_GUN_THRESHOLD_MINUTES:
             flags["is_trash"] = True
-            flags["reasons"].append("快枪手：平均持仓时间 < 1 分钟")
+            reasons.append("快枪手：平均持仓时间 < 1 分钟")
         
         # 2. 归零战神：胜率 >= 90% 且最大亏损 <= -95%（已移除，不加入黑名单）
         # if win_rate >= ZERO_WARRIOR_WIN_RATE and max_loss <= ZERO_WARRIOR_MAX_LOSS:
         #     flags["is_trash"] = True
-        #     flags["reasons"].append("归零战神：胜率高但一输就归零")
+        #     reasons.append("归零战神：胜率高但一输就归零")
 
         # 3. 内幕狗：只交易过 1-2 个代币（已移除，不加入黑名单，万一以后会变强）
         # if unique_tokens <= INSIDER_DOG_MAX_TOKENS:
         #     flags["is_trash"] = True
-        #     flags["reasons"].append(f"内幕狗：只交易过 {unique_tokens} 个代币")
+        #     reasons.append(f"内幕狗：只交易过 {unique_tokens} 个代币")
 
         # 4. 交易超过5个代币但目前仍然处于亏损
         if unique_tokens > 5 and total_profit < 0:
             flags["is_trash"] = True
-            flags["reasons"].append(f"交易{unique_tokens}个代币但仍亏损 {total_profit:.2f} SOL")
+            reasons.append(f"交易{unique_tokens}个代币但仍亏损 {total_profit:.2f} SOL")
 
         # 5. 亏损>95%的代币占比总交易代币数大于10%
         if unique_tokens > 0:
-            # 统计亏损<=-95%的代币数量
-            severe_losses = [r for r in losses if r.get('roi', 0) <= -0.95]
-            severe_loss_count = len(severe_losses)
+            # 亏损<=-95%的代币数量（已在 _collect_result_stats 中统计）
+            severe_loss_count = profit_dim["severe_loss_count"]
             # 计算占比
             severe_loss_ratio = severe_loss_count / unique_tokens if unique_tokens > 0 else 0
             # 如果占比 > 10%，则认为是垃圾地址
             if severe_loss_ratio > 0.10:
                 flags["is_trash"] = True
-                flags["reasons"].append(f"亏损>95%的代币占比{severe_loss_ratio:.1%}({severe_loss_count}/{unique_tokens})超过10%")
+                reasons.append(f"亏损>95%的代币占比{severe_loss_ratio:.1%}({severe_loss_count}/{unique_tokens})超过10%")
 
         # 6. 交易超过5个代币，盈亏比小于1
         if unique_tokens > 5 and profit_factor < 1.0:
             flags["is_trash"] = True
-            flags["reasons"].append(f"交易{unique_tokens}个代币但盈亏比{profit_factor:.2f} < 1")
+            reasons.append(f"交易{unique_tokens}个代币但盈亏比{profit_factor:.2f} < 1")
 
         # 7. 胜率小于40%的同时盈亏比小于2
         if win_rate < 0.40 and profit_factor < 2.0:
             flags["is_trash"] = True
-            flags["reasons"].append(f"胜率{win_rate:.1%} < 40% 且盈亏比{profit_factor:.2f} < 2")
+            reasons.append(f"胜率{win_rate:.1%} < 40% 且盈亏比{profit_factor:.2f} < 2")
 
         # 8. 最大单笔亏损超过 -50%（不符合S级标准，仅警告）
         if max_loss < S_TIER_MAX_SINGLE_LOSS:
-            flags["reasons"].append(f"最大单笔亏损 {max_loss:.1%} 超过 -50%，缺乏止损纪律")
+            reasons.append(f"最大单笔亏损 {max_loss:.1%} 超过 -50%，缺乏止损纪律")
         
         return flags
     
@@ -1641,42 +1933,47 @@ class WalletScorerV2:
         Returns:
             定位评分字典
         """
+        # 三个维度分数只取一次
+        profit_score = profit_dim["score"]
+        persistence_score = persistence_dim["score"]
+        authenticity_score = authenticity_dim["score"]
+        
         positioning = {}
         
         # 🛡️ 稳健中军：胜率高、盈亏比好、持仓时间适中
         stability_score = (
-            persistence_dim.get("score", 0) * 0.4 +
-            profit_dim.get("score", 0) * 0.4 +
-            authenticity_dim.get("score", 0) * 0.2
+            persistence_score * 0.4 +
+            profit_score * 0.4 +
+            authenticity_score * 0.2
         )
-        positioning["🛡️ 稳健中军"] = int(stability_score)
+        positioning[ROLE_STABLE] = int(stability_score)
         
         # ⚔️ 土狗猎手：盈亏比极高、单币ROI高、交易频次高
         hunter_score = (
-            profit_dim.get("score", 0) * 0.5 +
-            persistence_dim.get("score", 0) * 0.3 +
-            authenticity_dim.get("score", 0) * 0.2
+            profit_score * 0.5 +
+            persistence_score * 0.3 +
+            authenticity_score * 0.2
         )
-        positioning["⚔️ 土狗猎手"] = int(hunter_score)
+        positioning[ROLE_HUNTER] = int(hunter_score)
         
         # 💎 钻石之手：持仓时间长、胜率高、代币多样性好
         diamond_score = (
-            authenticity_dim.get("score", 0) * 0.5 +
-            persistence_dim.get("score", 0) * 0.3 +
-            profit_dim.get("score", 0) * 0.2
+            authenticity_score * 0.5 +
+            persistence_score * 0.3 +
+            profit_score * 0.2
         )
-        positioning["💎 钻石之手"] = int(diamond_score)
+        positioning[ROLE_DIAMOND] = int(diamond_score)
         
         # 🚀 短线高手：交易频次高、胜率高、持仓时间短但有效
-        if authenticity_dim.get("avg_hold_time", 0) < 120:  # 2小时以内
+        if authenticity_dim["avg_hold_time"] < 120:  # 2小时以内
             short_term_score = (
-                persistence_dim.get("score", 0) * 0.5 +
-                profit_dim.get("score", 0) * 0.3 +
-                authenticity_dim.get("score", 0) * 0.2
+                persistence_score * 0.5 +
+                profit_score * 0.3 +
+                authenticity_score * 0.2
             )
-            positioning["🚀 短线高手"] = int(short_term_score)
+            positioning[ROLE_SHORT_TERM] = int(short_term_score)
         else:
-            positioning["🚀 短线高手"] = 0
+            positioning[ROLE_SHORT_TERM] = 0
         
         return positioning
     
@@ -1697,52 +1994,65 @@ class WalletScorerV2:
         if flags.get("is_trash", False):
             return 0, "F", "垃圾地址：" + " | ".join(flags.get("reasons", []))
         
+        # 根据S级标准进行额外加分
+        profit_pct_30d = profit_dim["profit_pct_30d"]
+        tokens_30d = persistence_dim["tokens_30d"]
+        win_rate = persistence_dim["win_rate"]
+        avg_hold_hours = authenticity_dim["avg_hold_time"] / 60
+        max_loss = profit_dim["max_single_loss"]
+        
+        # S级加分（最多+20分）：布尔值即 0/1，与各项分值相乘后求和
+        bonus = (
+            (profit_pct_30d >= 100) * 5  # 30天盈利 >= 100%
+            + (tokens_30d >= S_TIER_MIN_TOKENS_30D) * 5
+            + (win_rate >= S_TIER_MIN_WIN_RATE) * 5
+            + (avg_hold_hours >= S_TIER_MIN_HOLD_TIME_HOURS) * 3
+            + (max_loss >= S_TIER_MAX_SINGLE_LOSS) * 2  # 没有超过-50%
+        )
+        
+        return WalletScorerV2._score_tier_description(
+            profit_dim["score"], persistence_dim["score"], authenticity_dim["score"], bonus
+        )
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _score_tier_description(
+        profit_score: int,
+        persistence_score: int,
+        authenticity_score: int,
+        bonus: int
+    ) -> Tuple[int, str, str]:
+        """
+        由三个维度分和S级加分得出最终评分、评级和描述
+        
+        入参均为小范围整数，按入参缓存结果，重复评分同一钱包时直接命中
+        
+        Args:
+            profit_score: 盈利力评分
+            persistence_score: 持久力评分
+            authenticity_score: 真实性评分
+            bonus: S级加分
+            
+        Returns:
+            (final_score, tier, description)
+        """
         # 加权平均
         final_score = (
-            profit_dim.get("score", 0) * 0.45 +  # 盈利力权重最高
-            persistence_dim.get("score", 0) * 0.35 +  # 持久力次之
-            authenticity_dim.get("score", 0) * 0.20  # 真实性
+            profit_score * 0.45 +  # 盈利力权重最高
+            persistence_score * 0.35 +  # 持久力次之
+            authenticity_score * 0.20  # 真实性
         )
         
-        # 根据S级标准进行额外加分
-        profit_pct_30d = profit_dim.get("profit_pct_30d", 0)
-        tokens_30d = persistence_dim.get("tokens_30d", 0)
-        win_rate = persistence_dim.get("win_rate", 0)
-        avg_hold_hours = authenticity_dim.get("avg_hold_time", 0) / 60
-        max_loss = profit_dim.get("max_single_loss", 0)
-        
-        # S级加分（最多+20分）
-        bonus = 0
-        if profit_pct_30d >= 100:  # 30天盈利 >= 100%
-            bonus += 5
-        if tokens_30d >= S_TIER_MIN_TOKENS_30D:
-            bonus += 5
-        if win_rate >= S_TIER_MIN_WIN_RATE:
-            bonus += 5
-        if avg_hold_hours >= S_TIER_MIN_HOLD_TIME_HOURS:
-            bonus += 3
-        if max_loss >= S_TIER_MAX_SINGLE_LOSS:  # 没有超过-50%
-            bonus += 2
-        
         final_score = min(100, int(final_score + bonus))
         
         # 评级
-        if final_score >= 90:
-            tier = "S"
-        elif final_score >= 80:
-            tier = "A"
-        elif final_score >= 70:
-            tier = "B"
-        elif final_score >= 60:
-            tier = "C"
-        else:
-            tier = "F"
+        tier = TIERS[bisect_right(TIER_CUTOFFS, final_score)]
         
         # 描述
         description = (
-            f"盈利力:{profit_dim.get('score', 0)} | "
-            f"持久力:{persistence_dim.get('score', 0)} | "
-            f"真实性:{authenticity_dim.get('score', 0)}"
+            f"盈利力:{profit_score} | "
+            f"持久力:{persistence_score} | "
+            f"真实性:{authenticity_score}"
         )
         
         return final_score, tier, description
@@ -1759,7 +2069,7 @@ async def main():
     db_manager = TransactionDBManager()
     analyzer = WalletAnalyzerV2(db_manager=db_manager)
     
-    async with aiohttp.ClientSession() as session:
+    async with create_http_session() as session:
         print(f"🔍 正在深度审计 V2 (超严格版): {args.wallet[:6]}...")
         txs = await analyzer.fetch_history_pagination(session, args.wallet, args.max_txs, analyzer.helius_api_key)
         
@@ -1777,9 +2087,11 @@ async def main():
         # 计算评分
         scores = WalletScorerV2.calculate_scores(analysis_result)
         
-        print("\n" + "═" * 70)
-        print(f"🧬 战力报告 V2 (超严格版): {args.wallet[:6]}...")
-        print("═" * 70)
+        # 报告整体缓冲后一次性写出，避免逐行 print 的多次写入和刷新
+        out = []
+        out.append("\n" + "═" * 70)
+        out.append(f"🧬 战力报告 V2 (超严格版): {args.wallet[:6]}...")
+        out.append("═" * 70)
         
         results = analysis_result["results"]
         dims = scores["dimensions"]
@@ -1790,72 +2102,116 @@ async def main():
         # 计算平均每次买入的SOL数量
         all_buy_amounts = []
         for r in results:
-            transactions = r.get("transactions", [])
-            for tx in transactions:
-                buy_sol = tx.get("buy_sol", 0)
+            for buy_sol in r.transactions.buy_sols:
                 if buy_sol > 1e-9:  # 只统计有效的买入金额
                     all_buy_amounts.append(buy_sol)
         avg_buy_sol = sum(all_buy_amounts) / len(all_buy_amounts) if all_buy_amounts else 0
 
         # 计算已清仓代币的平均买入次数和卖出次数
-        settled_tokens = [r for r in results if not r.get('is_unsettled', False) and r.get('remaining_tokens', 0) == 0]
+        settled_tokens = [r for r in results if not r.is_unsettled and r.remaining_tokens == 0]
         if settled_tokens:
-            avg_buy_count = sum(r.get('buy_count', 0) for r in settled_tokens) / len(settled_tokens)
-            avg_sell_count = sum(r.get('sell_count', 0) for r in settled_tokens) / len(settled_tokens)
+            avg_buy_count = sum(r.buy_count for r in settled_tokens) / len(settled_tokens)
+            avg_sell_count = sum(r.sell_count for r in settled_tokens) / len(settled_tokens)
         else:
             avg_buy_count = 0
             avg_sell_count = 0
 
-        print(f"📊 核心汇总:")
-        print(f"   • 项目总数: {len(results)}")
-        print(f"   • 胜率: {persistence_dim['win_rate']:.1%}")
-        print(f"   • 盈亏比: {profit_dim['profit_factor']:.2f}")
-        print(f"   • 累计利润: {profit_dim['total_profit']:+,.2f} SOL")
-        print(f"   • 30天利润: {profit_dim['profit_30d']:+,.2f} SOL ({profit_dim['profit_pct_30d']:.1f}%)")
-        print(f"   • 7天利润: {profit_dim['profit_7d']:+,.2f} SOL ({profit_dim['profit_pct_7d']:.1f}%)")
-        print(f"   • 排除最高收益后盈利: {profit_dim.get('profit_pct_excluding_max', 0):.1f}%")
-        print(f"   • 平均持仓: {authenticity_dim['avg_hold_time']:.1f} 分钟")
-        print(f"   • 代币多样性: {authenticity_dim['unique_tokens']} 个")
-        print(f"   • 30天交易: {persistence_dim['tokens_30d']} 个代币, {persistence_dim['tx_count_30d']} 笔")
-        print(f"   • 平均每次买入: {avg_buy_sol:.3f} SOL")
-        print(f"   • 已清仓代币平均买入次数: {avg_buy_count:.2f} 次")
-        print(f"   • 已清仓代币平均卖出次数: {avg_sell_count:.2f} 次")
-        
-        print("-" * 70)
-        print(f"🎯 维度评分:")
-        print(f"   • 盈利力: {profit_dim['score']}/100")
-        print(f"   • 持久力: {persistence_dim['score']}/100")
-        print(f"   • 真实性: {authenticity_dim['score']}/100")
-        
-        print("-" * 70)
-        print(f"📍 定位评分:")
+        out.append(f"📊 核心汇总:")
+        out.append(f"   • 项目总数: {len(results)}")
+        out.append(f"   • 胜率: {persistence_dim['win_rate']:.1%}")
+        out.append(f"   • 盈亏比: {profit_dim['profit_factor']:.2f}")
+        out.append(f"   • 累计利润: {profit_dim['total_profit']:+,.2f} SOL")
+        out.append(f"   • 30天利润: {profit_dim['profit_30d']:+,.2f} SOL ({profit_dim['profit_pct_30d']:.1f}%)")
+        out.append(f"   • 7天利润: {profit_dim['profit_7d']:+,.2f} SOL ({profit_dim['profit_pct_7d']:.1f}%)")
+        out.append(f"   • 排除最高收益后盈利: {profit_dim.get('profit_pct_excluding_max', 0):.1f}%")
+        out.append(f"   • 平均持仓: {authenticity_dim['avg_hold_time']:.1f} 分钟")
+        out.append(f"   • 代币多样性: {authenticity_dim['unique_tokens']} 个")
+        out.append(f"   • 30天交易: {persistence_dim['tokens_30d']} 个代币, {persistence_dim['tx_count_30d']} 笔")
+        out.append(f"   • 平均每次买入: {avg_buy_sol:.3f} SOL")
+        out.append(f"   • 已清仓代币平均买入次数: {avg_buy_count:.2f} 次")
+        out.append(f"   • 已清仓代币平均卖出次数: {avg_sell_count:.2f} 次")
+        
+        out.append("-" * 70)
+        out.append(f"🎯 维度评分:")
+        out.append(f"   • 盈利力: {profit_dim['score']}/100")
+        out.append(f"   • 持久力: {persistence_dim['score']}/100")
+        out.append(f"   • 真实性: {authenticity_dim['score']}/100")
+        
+        out.append("-" * 70)
+        out.append(f"📍 定位评分:")
         for role, score in scores["positioning"].items():
-            bar_length = score // 10
-            bar = '█' * bar_length + '░' * (10 - bar_length)
-            print(f"   {role}: {bar} {score}分")
+            bar = SCORE_BARS[score // 10]
+            out.append(f"   {role}: {bar} {score}分")
         
-        print("-" * 70)
-        print(f"🏆 综合评级: [{scores['tier']}级] {scores['final_score']} 分")
-        print(f"📝 状态评价: {scores['description']}")
+        out.append("-" * 70)
+        out.append(f"🏆 综合评级: [{scores['tier']}级] {scores['final_score']} 分")
+        out.append(f"📝 状态评价: {scores['description']}")
         
         if scores["flags"]["is_trash"]:
-            print(f"⚠️  垃圾地址标识: {' | '.join(scores['flags']['reasons'])}")
+            out.append(f"⚠️  垃圾地址标识: {' | '.join(scores['flags']['reasons'])}")
         elif scores["flags"]["reasons"]:
-            print(f"⚠️  警告: {' | '.join(scores['flags']['reasons'])}")
-        
-        print("-" * 70)
-        
-        print("\n📝 重点项目明细 (按利润排序):")
-        results_sorted = sorted(results, key=lambda x: x['profit'], reverse=True)
-        for r in results_sorted[:10]:
-            status_icon = '🟢' if r['is_win'] else '🔴'
-            token_short = r['token'][:8] + '..'
-            profit = r['profit']
-            roi_pct = r['roi'] * 100
-            hold_time = r['hold_time']
-            print(
+            out.append(f"⚠️  警告: {' | '.join(scores['flags']['reasons'])}")
+        
+        out.append("-" * 70)
+        
+        out.append("\n📝 重点项目明细 (按利润排序):")
+        # 只需前 10 名：堆选取 O(n log 10)，结果与完整降序排序后取前 10 一致
+        for r in heapq.nlargest(10, results, key=attrgetter('profit')):
+            status_icon = '🟢' if r.is_win else '🔴'
+            token_short = r.token[:8] + '..'
+            profit = r.profit
+            roi_pct = r.roi * 100
+            hold_time = r.hold_time
+            out.append(
                 f" {status_icon} {token_short} | 利润 {profit:>+8.2f} SOL | ROI {roi_pct:>+7.1f}% | 持仓 {hold_time:>6.1f} 分钟")
+        
+        sys.stdout.write("\n".join(out) + "\n")
+
+
+def create_http_session() -> aiohttp.ClientSession:
+    """
+    创建带连接池调优的 aiohttp 会话
+    
+    分页拉取交易历史是按游标串行的，耗时主要在逐页的 TLS 握手和 DNS 解析上；
+    放宽连接数上限并延长 DNS 缓存和空闲连接保活，让后续分页和价格请求复用已有连接
+    
+    Returns:
+        aiohttp 会话对象（需由调用方关闭，推荐 async with 使用）
+    """
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_CONNECTOR_LIMIT,
+        limit_per_host=HTTP_CONNECTOR_LIMIT_PER_HOST,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        enable_cleanup_closed=True
+    )
+    timeout = aiohttp.ClientTimeout(total=HTTP_TOTAL_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=timeout,
+        json_serialize=lambda obj: orjson.dumps(obj).decode()
+    )
+
+
+def install_fast_event_loop() -> bool:
+    """
+    在 Linux 上尽量切换到 uvloop 事件循环（libuv 实现，减少分页请求的调度和系统调用开销）
+    
+    uvloop 为可选依赖，未安装或非 Linux 平台时保持默认 asyncio 事件循环
+    
+    Returns:
+        是否已切换到 uvloop
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
 
 
 if __name__ == "__main__":
+    install_fast_event_loop()
     asyncio.run(main())
@@ -10,25 +10,44 @@
 @Author     : Auto-generated
 @Date       : 2026-02-02
 """
+import argparse
 import asyncio
+import atexit
+import csv
+import heapq
 import logging
 import os
-import re
 import sys
+import time
 from datetime import datetime
+from contextlib import asynccontextmanager
+from operator import itemgetter
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
+from typing import AsyncIterator, List, Optional, Set, Tuple
 
 import aiohttp
 import pandas as pd
 from tqdm.asyncio import tqdm
 
+try:
+    import xlsxwriter  # 可选依赖：逐行流式写入 Excel，未安装时回退到 openpyxl
+except ImportError:
+    xlsxwriter = None
+
+try:
+    import pyarrow  # 可选依赖：写 Parquet 检查点，未安装时回退到 CSV
+except ImportError:
+    pyarrow = None
+
 # 确保能找到 analyze_wallet 模块
 current_dir = Path(__file__).parent
 sys.path.insert(0, str(current_dir))
 
 from key_list import HELIUS_KEY_LIST, JUPITER_KEY_LIST
-from analyze_wallet import WalletAnalyzerV2, WalletScorerV2, TransactionDBManager
+from analyze_wallet import (
+    WalletAnalyzerV2, WalletScorerV2, TransactionDBManager, create_http_session, install_fast_event_loop,
+    ROLE_STABLE, ROLE_HUNTER, ROLE_DIAMOND, ROLE_SHORT_TERM
+)
 
 # 配置日志
 logging.basicConfig(
@@ -42,9 +61,50 @@ TOOLS_DIR = Path(__file__).parent.parent
 TRASH_FILE = str(TOOLS_DIR / "wallets_trash.txt")
 WALLETS_FILE = str(TOOLS_DIR / "wallets_check.txt")
 RESULTS_DIR = str(Path(__file__).parent / "results")
+PROGRESS_LOG_TEMPLATE = os.path.join(RESULTS_DIR, "wallet_ranking_v2_progress_{}.csv")  # 分析过程中逐行追加的结果日志（每次运行按时间戳单独命名，不覆盖中断运行留下的日志）
 CONCURRENT_LIMIT = 5  # 并发限制
 DUST_THRESHOLD = 0.01  # 粉尘阈值：未实现收益低于此值的代币视为粉尘
 MAX_TXS = 1000  # 最大交易数获取
+TRASH_FLUSH_THRESHOLD = 50  # 黑名单缓冲地址数达到该值时批量写入文件
+REPORT_ADDRESS_COL_WIDTH = 46  # 报告中钱包地址列的列宽
+EXCEL_MAX_ROWS = 50_000  # 超过该行数时默认只写检查点文件，不再生成 Excel（XML 序列化过慢）
+BATCH_WORKERS_PER_KEY = 2  # 每个 Helius Key 对应的工作协程数（一个占用 Key 拉取数据时，另一个可进行解析/评分）
+PROGRESS_REFRESH_INTERVAL = 0.1  # 进度条刷新间隔（秒），由单个后台任务统一刷新
+
+# 报告列顺序（重要信息在前），与 analyze_one_wallet 返回的结果元组逐位对应
+REPORT_COLUMNS = [
+    "钱包地址", "综合评分", "战力评级", "最佳定位", "定位评分",
+    "垃圾地址", "垃圾地址原因",
+    "盈利力评分", "持久力评分", "真实性评分",
+    "盈亏比", "胜率", "总盈亏(SOL)", "30天盈利(SOL)", "30天盈利(%)",
+    "7天盈利(SOL)", "7天盈利(%)", "最大单笔ROI", "最大单笔亏损",
+    "平均持仓(分钟)", "盈利持仓(分钟)", "亏损持仓(分钟)",
+    "代币多样性", "30天代币数", "30天交易数", "7天代币数", "7天交易数",
+    "项目总数", "亏损代币数量", "未结算token数", "未结算盈利(SOL)", "未结算ROI", "未结算平均持仓(分钟)",
+    "单币亏损>95%数量", "去掉最高收益后整体ROI",
+    "平均每次买入(SOL)", "已清仓代币平均买入次数", "已清仓代币平均卖出次数",
+    ROLE_STABLE, ROLE_HUNTER, ROLE_DIAMOND, ROLE_SHORT_TERM,
+    "分析时间"
+]
+REPORT_COLUMN_INDEX = {name: i for i, name in enumerate(REPORT_COLUMNS)}  # 列名 -> 结果元组下标
+# 导出时按列统一保留的小数位数
+REPORT_ROUND_DIGITS = {
+    "盈亏比": 2, "胜率": 3, "总盈亏(SOL)": 2,
+    "30天盈利(SOL)": 2, "30天盈利(%)": 2, "7天盈利(SOL)": 2, "7天盈利(%)": 2,
+    "平均持仓(分钟)": 1, "盈利持仓(分钟)": 1, "亏损持仓(分钟)": 1,
+    "未结算盈利(SOL)": 2, "未结算平均持仓(分钟)": 1,
+    "平均每次买入(SOL)": 3, "已清仓代币平均买入次数": 2, "已清仓代币平均卖出次数": 2,
+}
+# 导出时按列格式化为百分比字符串的列及其小数位数
+REPORT_PERCENT_DIGITS = {"最大单笔ROI": 0, "最大单笔亏损": 1, "未结算ROI": 1}
+BASE58_BYTES = b"123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"  # Base58 字符集：不包含 0, O, I, l
+# 不作为钱包的地址（系统地址、系统程序、Token 程序、关联账户程序），集合判断为 O(1)
+EXCLUDED_ADDRESSES = frozenset({
+    "So11111111111111111111111111111111111111111",  # 系统地址
+    "11111111111111111111111111111111",  # System Program
+    "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA",  # Token Program
+    "ATokenGPvbdGVxr1b2hvZbsiqW5xWH25efTNsLJA8knL",  # Associated Token Account Program
+})
 
 
 class APIKeyManager:
@@ -52,19 +112,19 @@ class APIKeyManager:
     API Key 管理器：负责管理多个 API Key，允许并行使用
     
     职责：
-    - 为每个 Key 创建独立的锁，允许不同 Key 并行使用
-    - 同一 Key 的调用通过锁保证串行执行（无间隔限制）
-    - 轮询选择 Key，实现负载均衡
-    - 不限制调用间隔，但遇到429错误时会进行退避重试
+    - 以 Key 池的方式分配 Key：不同 Key 可并行使用，同一 Key 同一时间只分配给一个调用方（串行执行）
+    - 按"下次可用时间"最小堆选择空闲 Key（最久未使用的优先），实现负载均衡
+    - 默认不限制调用间隔（可通过 min_interval 设置同一 Key 的最小间隔），遇到429错误时会进行退避重试
     """
 
-    def __init__(self, key_list: List[str], api_name: str = "API"):
+    def __init__(self, key_list: List[str], api_name: str = "API", min_interval: float = 0.0):
         """
         初始化 API Key 管理器
         
         Args:
             key_list: API Key 列表
             api_name: API 名称（用于日志）
+            min_interval: 同一 Key 归还后到下一次使用之间的最小间隔（秒），0 表示不限制
         """
         if not key_list:
             raise ValueError(f"{api_name} Key 列表不能为空")
@@ -72,25 +132,38 @@ class APIKeyManager:
         if not self.key_list:
             raise ValueError(f"{api_name} Key 列表中没有有效的 Key")
         self.api_name = api_name
-        # 为每个 Key 创建独立的锁
-        self.key_locks: Dict[str, asyncio.Lock] = {key: asyncio.Lock() for key in self.key_list}
-        self.current_index = 0
-        self._index_lock = asyncio.Lock()  # 用于轮询选择Key的锁
-        logger.info(f"初始化 {api_name} Key 管理器: {len(self.key_list)} 个 Keys（支持并行，无间隔限制）")
-
-    async def get_key_and_lock(self) -> Tuple[str, asyncio.Lock]:
+        self.min_interval = min_interval
+        # 空闲 Key 的最小堆：(下次可用时间, 归还序号, Key下标)，归还序号保证同一时间下按最久未使用轮换
+        # 堆操作之间没有 await，在单线程事件循环中天然原子，无需加锁
+        self._key_heap: List[Tuple[float, int, int]] = [(0.0, i, i) for i in range(len(self.key_list))]
+        self._seq = len(self.key_list)
+        # 空闲 Key 计数：取得信号量后堆中必然至少有一个 Key
+        self._free_keys = asyncio.Semaphore(len(self.key_list))
+        interval_desc = f"同一Key最小间隔 {min_interval}s" if min_interval > 0 else "无间隔限制"
+        logger.info(f"初始化 {api_name} Key 管理器: {len(self.key_list)} 个 Keys（支持并行，{interval_desc}）")
+
+    @asynccontextmanager
+    async def acquire_key(self) -> AsyncIterator[str]:
         """
-        获取下一个可用的 API Key 和对应的锁（轮询选择）
+        从 Key 池中借出一个空闲 Key，退出上下文时归还（O(log N) 堆选择）
         
-        注意：返回的锁用于保证同一Key的调用串行执行，但无时间间隔限制
+        同一 Key 在归还前不会分配给其他调用方，因此无需额外的每 Key 锁；
+        所有 Key 都在使用中时等待任意一个 Key 归还。用法：async with manager.acquire_key() as key
         
-        Returns:
-            (key, lock): 可用的 API Key 和对应的锁（使用 async with lock 来保证串行）
+        Yields:
+            可用的 API Key
         """
-        async with self._index_lock:
-            key = self.key_list[self.current_index]
-            self.current_index = (self.current_index + 1) % len(self.key_list)
-            return key, self.key_locks[key]
+        await self._free_keys.acquire()
+        next_time, _, index = heapq.heappop(self._key_heap)
+        try:
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield self.key_list[index]
+        finally:
+            heapq.heappush(self._key_heap, (time.monotonic() + self.min_interval, self._seq, index))
+            self._seq += 1
+            self._free_keys.release()
 
 
 def is_valid_solana_address(address: str) -> bool:
@@ -110,12 +183,12 @@ def is_valid_solana_address(address: str) -> bool:
     if not (32 <= len(address) <= 44):
         return False
 
-    # Base58 字符集：不包含 0, O, I, l
-    if not re.match(r'^[1-9A-HJ-NP-Za-km-z]+$', address):
+    # Base58 字符集：不包含 0, O, I, l（删除所有合法字节后应为空，整个检查在 C 层完成，无需正则引擎）
+    if not address.isascii() or address.encode().translate(None, BASE58_BYTES):
         return False
 
-    # 排除系统地址
-    if address == "So11111111111111111111111111111111111111111":
+    # 排除系统地址和程序地址
+    if address in EXCLUDED_ADDRESSES:
         return False
 
     return True
@@ -129,7 +202,8 @@ class WalletListSaver:
     @staticmethod
     def save_valid_addresses(
             addresses: List[str],
-            wallets_file: str = WALLETS_FILE
+            wallets_file: str = WALLETS_FILE,
+            skip_validation: bool = False
     ) -> bool:
         """
         保存有效的钱包地址到文件（去重、验证格式）
@@ -137,6 +211,7 @@ class WalletListSaver:
         Args:
             addresses: 钱包地址列表
             wallets_file: 钱包列表文件路径
+            skip_validation: 地址已在上游校验过时跳过格式校验（只去重）
             
         Returns:
             是否成功保存
@@ -147,22 +222,23 @@ class WalletListSaver:
 
         try:
             # 验证并去重
-            valid_addresses = set()
-            for addr in addresses:
-                addr = addr.strip()
-                if addr and is_valid_solana_address(addr):
-                    valid_addresses.add(addr)
+            if skip_validation:
+                valid_addresses = set(addresses)
+            else:
+                # is_valid_solana_address 已拒绝空串，集合推导直接完成去空、校验和去重
+                valid_addresses = {addr for addr in map(str.strip, addresses) if is_valid_solana_address(addr)}
 
             if not valid_addresses:
                 logger.warning("没有有效的钱包地址需要保存")
                 return False
 
-            # 排序并保存
-            sorted_addresses = sorted(list(valid_addresses))
+            # 排序后先写入临时文件，再原子替换原文件（中途中断不会留下被截断的钱包列表）
+            sorted_addresses = sorted(valid_addresses)
+            tmp_file = wallets_file + ".tmp"
 
-            with open(wallets_file, 'w', encoding='utf-8') as f:
-                for addr in sorted_addresses:
-                    f.write(f"{addr}\n")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write("\n".join(sorted_addresses) + "\n")
+            os.replace(tmp_file, wallets_file)
 
             logger.info(f"已保存 {len(sorted_addresses)} 个有效钱包地址到 {wallets_file}")
             return True
@@ -177,15 +253,20 @@ class TrashListManager:
     黑名单管理器：负责管理低质量钱包黑名单
     """
 
-    def __init__(self, trash_file: str = TRASH_FILE):
+    def __init__(self, trash_file: str = TRASH_FILE, flush_threshold: int = TRASH_FLUSH_THRESHOLD):
         """
         初始化黑名单管理器
         
         Args:
             trash_file: 黑名单文件路径
+            flush_threshold: 缓冲地址数达到该值时批量写入文件
         """
         self.trash_file = trash_file
+        self.flush_threshold = flush_threshold
         self._trash_set: Optional[Set[str]] = None
+        self._pending: List[str] = []  # 已加入黑名单但尚未写入文件的地址
+        # 兜底：调用方未显式 flush() 时，解释器退出前写入剩余缓冲
+        atexit.register(self.flush)
 
     def load(self) -> Set[str]:
         """
@@ -198,40 +279,65 @@ class TrashListManager:
             return self._trash_set
 
         if not os.path.exists(self.trash_file):
-            self._trash_set = set()
+            self._trash_set = set(self._pending)
             return self._trash_set
 
         try:
+            # 一次读入后在 C 层按行切分，避免逐行迭代文件对象
             with open(self.trash_file, 'r', encoding='utf-8') as f:
-                self._trash_set = {line.strip() for line in f if line.strip()}
+                self._trash_set = set(map(str.strip, f.read().splitlines()))
+            self._trash_set.discard("")
             logger.info(f"加载黑名单: {len(self._trash_set)} 个地址")
         except Exception as e:
             logger.error(f"加载黑名单失败: {e}")
             self._trash_set = set()
 
+        # 缓冲中尚未写入文件的地址也属于黑名单
+        self._trash_set.update(self._pending)
         return self._trash_set
 
     def add(self, address: str) -> bool:
         """
         添加地址到黑名单
         
+        地址先进入内存缓冲，累计到 flush_threshold 个时一次性追加写入文件；
+        结束前需调用 flush() 写入剩余地址（进程退出时也会自动 flush）。
+        黑名单已加载时，已在集合中的地址直接跳过，不重复写入文件
+        
         Args:
             address: 钱包地址
             
         Returns:
             是否成功添加
         """
-        try:
-            with open(self.trash_file, 'a', encoding='utf-8') as f:
-                f.write(f"{address}\n")
+        if self._trash_set is not None:
+            if address in self._trash_set:
+                return True
+            self._trash_set.add(address)
+        self._pending.append(address)
+        logger.debug(f"已添加地址到黑名单: {address[:6]}...")
+
+        if len(self._pending) >= self.flush_threshold:
+            return self.flush()
+        return True
 
-            if self._trash_set is not None:
-                self._trash_set.add(address)
+    def flush(self) -> bool:
+        """
+        将缓冲中的黑名单地址批量追加写入文件
+        
+        Returns:
+            是否成功写入（无待写入地址时返回 True）
+        """
+        if not self._pending:
+            return True
 
-            logger.debug(f"已添加地址到黑名单: {address[:6]}...")
+        try:
+            with open(self.trash_file, 'a', encoding='utf-8') as f:
+                f.writelines(f"{addr}\n" for addr in self._pending)
+            self._pending.clear()
             return True
         except Exception as e:
-            logger.error(f"添加黑名单失败: {e}")
+            logger.error(f"写入黑名单失败: {e}")
             return False
 
     def contains(self, address: str) -> bool:
@@ -244,9 +350,8 @@ class TrashListManager:
         Returns:
             是否在黑名单中
         """
-        if self._trash_set is None:
-            self.load()
-        return address in (self._trash_set or set())
+        # load() 带缓存，首次调用后直接返回内存中的集合
+        return address in self.load()
     
     def clear(self) -> bool:
         """
@@ -258,6 +363,7 @@ class TrashListManager:
         try:
             if os.path.exists(self.trash_file):
                 os.remove(self.trash_file)
+            self._pending.clear()
             self._trash_set = set()
             logger.info("黑名单已清空")
             return True
@@ -282,13 +388,14 @@ class TrashListManager:
             if address not in self._trash_set:
                 return False
             
-            # 重新写入文件（排除要移除的地址）
+            # 重新写入文件（排除要移除的地址，缓冲中的地址一并写入）
             addresses = [addr for addr in self._trash_set if addr != address]
             with open(self.trash_file, 'w', encoding='utf-8') as f:
                 for addr in addresses:
                     f.write(f"{addr}\n")
             
             self._trash_set.remove(address)
+            self._pending.clear()
             logger.debug(f"已从黑名单移除地址: {address[:6]}...")
             return True
         except Exception as e:
@@ -304,13 +411,13 @@ class WalletListLoader:
     @staticmethod
     def load(wallets_file: str = WALLETS_FILE) -> List[str]:
         """
-        从文件加载钱包地址列表
+        从文件加载钱包地址列表（单次遍历完成去重和格式校验，保持文件中的顺序）
         
         Args:
             wallets_file: 钱包列表文件路径
             
         Returns:
-            钱包地址列表
+            有效的钱包地址列表（已去重）
         """
         if not os.path.exists(wallets_file):
             logger.error(f"找不到钱包列表文件: {wallets_file}")
@@ -318,12 +425,11 @@ class WalletListLoader:
 
         try:
             with open(wallets_file, 'r', encoding='utf-8') as f:
-                addresses = [
-                    line.strip()
-                    for line in f
-                    if line.strip() and not line.startswith("#")
-                ]
-                addresses = list(set(addresses))
+                addresses = list(dict.fromkeys(
+                    addr
+                    for addr in map(str.strip, f.read().splitlines())
+                    if addr and not addr.startswith("#") and is_valid_solana_address(addr)
+                ))
             logger.info(f"从 {wallets_file} 加载了 {len(addresses)} 个地址")
             return addresses
         except Exception as e:
@@ -371,32 +477,45 @@ class BatchAnalyzerV2:
         self.concurrent_limit = concurrent_limit
         # 数据处理并发控制
         self.data_processing_semaphore = asyncio.Semaphore(concurrent_limit)
-        # 移除全局api_lock，改为每个Key独立的锁（允许N个Key并行，N=key数量）
+        # API Key 以 Key 池方式借出/归还（允许N个Key并行，N=key数量，同一Key串行）
+        # 共享 HTTP 会话：通过 async with 进入后，多次 analyze_batch 复用同一连接池
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> 'BatchAnalyzerV2':
+        """进入上下文：创建共享 HTTP 会话"""
+        if self._session is None:
+            self._session = create_http_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        """退出上下文：关闭共享 HTTP 会话"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
 
     async def analyze_one_wallet(
             self,
             session: aiohttp.ClientSession,
             address: str,
-            pbar: tqdm,
-            max_txs: int = 5000
-    ) -> Optional[Dict]:
+            max_txs: int = 5000,
+            analysis_time: Optional[str] = None
+    ) -> Optional[Tuple]:
         """
         分析单个钱包（生产者-消费者模式）
         
         Args:
             session: aiohttp 会话对象
             address: 钱包地址
-            pbar: 进度条对象
             max_txs: 最大交易数量
+            analysis_time: 分析时间（批量分析时整批共用一个，为 None 时取当前时间）
             
         Returns:
-            分析结果字典，如果失败或应过滤则返回 None
+            分析结果元组（按 REPORT_COLUMNS 顺序），如果失败或应过滤则返回 None
         """
         try:
             # === 阶段1：API调用（允许N个Key并行，N=key数量，但同一Key内部串行）===
-            # 获取可用的Helius Key和对应的锁（确保同一Key串行调用，无间隔限制）
-            helius_key, helius_lock = await self.helius_key_manager.get_key_and_lock()
-            async with helius_lock:
+            # 从 Key 池借出空闲的Helius Key（同一Key同时只借给一个任务，确保串行调用）
+            async with self.helius_key_manager.acquire_key() as helius_key:
                 # 1. 拉取交易数据（Helius API）
                 try:
                     txs = await self.analyzer.fetch_history_pagination(
@@ -405,29 +524,24 @@ class BatchAnalyzerV2:
                 except ValueError as e:
                     # API Key 未配置等配置错误
                     logger.error(f"配置错误: {e}")
-                    pbar.update(1)
                     return None
                 except aiohttp.ClientError as e:
                     # 网络错误（连接失败、超时等）
                     logger.warning(f"网络错误获取钱包 {address[:8]}... 交易数据: {e}")
-                    pbar.update(1)
                     return None
                 except Exception as e:
                     # 其他未知错误
                     logger.warning(f"获取钱包 {address[:8]}... 交易数据失败: {e}")
-                    pbar.update(1)
                     return None
 
                 # 如果返回空列表，可能是地址不存在（404），加入黑名单
                 if txs == []:
                     logger.info(f"地址不存在或无效: {address[:8]}...，加入黑名单")
                     self.trash_manager.add(address)
-                    pbar.update(1)
                     return None
 
                 # 优化：如果交易数量太少（<10笔），可能不值得分析，提前退出
                 if not txs or len(txs) < 10:
-                    pbar.update(1)
                     return None
 
             # 2. 解析代币项目（内部会调用 Jupiter API）
@@ -439,13 +553,11 @@ class BatchAnalyzerV2:
                 )
             except Exception as e:
                 logger.warning(f"解析钱包 {address[:8]}... 代币项目失败: {e}")
-                pbar.update(1)
                 return None
 
             # 优化：如果有效项目太少，提前退出
             results = analysis_result.get("results", [])
             if not results or len(results) < 3:
-                pbar.update(1)
                 return None
 
             # === 阶段2：数据处理（可以并发）===
@@ -465,8 +577,7 @@ class BatchAnalyzerV2:
                 if is_trash:
                     logger.debug(f"地址 {address[:8]}... 被识别为垃圾地址（写入报告）: {trash_reasons_str}")
 
-                # 5. 提取详细指标（纯数据处理）
-                results = analysis_result["results"]
+                # 5. 提取详细指标（纯数据处理；results 已在上面绑定）
                 dims = scores["dimensions"]
                 profit_dim = dims["profit"]
                 persistence_dim = dims["persistence"]
@@ -477,115 +588,122 @@ class BatchAnalyzerV2:
                 best_role = "未知"
                 best_role_score = 0
                 if positioning:
-                    best_role = max(positioning, key=positioning.get)
-                    best_role_score = positioning[best_role]
+                    best_role, best_role_score = max(positioning.items(), key=itemgetter(1))
 
                 # 7. 计算基础指标
-                wins = [r for r in results if r.get('is_win', False)]
-                losses = [r for r in results if not r.get('is_win', False)]
-                win_rate = len(wins) / len(results) if results else 0
+                # 胜率与盈利项目数在评分阶段已统计，直接复用
+                win_rate = persistence_dim["win_rate"]
+                win_count = persistence_dim["win_count"]
                 total_profit = profit_dim.get("total_profit", 0)
                 max_roi = profit_dim.get("max_roi", 0)
 
-                # 8. 计算未结算token统计（排除粉尘）
-                unsettled_tokens = [
-                    r for r in results
-                    if r.get('is_unsettled', False) and r.get('unrealized_sol', 0) >= DUST_THRESHOLD
-                ]
-
-                unsettled_count = len(unsettled_tokens)
-                unsettled_profit = sum(r.get('unrealized_sol', 0) for r in unsettled_tokens)
-                unsettled_hold_times = [r.get('hold_time', 0) for r in unsettled_tokens if r.get('hold_time', 0) > 0]
-                unsettled_avg_hold_time = sum(unsettled_hold_times) / len(
-                    unsettled_hold_times) if unsettled_hold_times else 0
-
-                # 计算未结算token的总成本（用于计算ROI）
-                # 使用未结算部分的成本，而不是总买入成本
-                unsettled_cost = sum(r.get('unsettled_cost', 0) for r in unsettled_tokens)
+                # 8. 单次遍历 results，同时累计未结算token、买入金额和已清仓代币的统计
+                # - 未结算token：排除粉尘；ROI 使用未结算部分的成本，而不是总买入成本
+                # - 买入金额：只统计有效的买入金额
+                # - 已清仓代币：只统计 remaining_tokens == 0 的代币（已完全清仓）
+                unsettled_count = 0
+                unsettled_profit = 0.0
+                unsettled_cost = 0.0
+                unsettled_hold_sum = 0.0
+                unsettled_hold_n = 0
+                buy_sol_sum = 0.0
+                buy_sol_n = 0
+                settled_n = 0
+                settled_buy_sum = 0
+                settled_sell_sum = 0
+                for r in results:
+                    if r.is_unsettled:
+                        if r.unrealized_sol >= DUST_THRESHOLD:
+                            unsettled_count += 1
+                            unsettled_profit += r.unrealized_sol
+                            unsettled_cost += r.unsettled_cost
+                            if r.hold_time > 0:
+                                unsettled_hold_sum += r.hold_time
+                                unsettled_hold_n += 1
+                    elif r.remaining_tokens == 0:
+                        settled_n += 1
+                        settled_buy_sum += r.buy_count
+                        settled_sell_sum += r.sell_count
+                    for buy_sol in r.transactions.buy_sols:
+                        if buy_sol > 1e-9:
+                            buy_sol_sum += buy_sol
+                            buy_sol_n += 1
+
+                unsettled_avg_hold_time = unsettled_hold_sum / unsettled_hold_n if unsettled_hold_n else 0
                 unsettled_roi = (unsettled_profit / unsettled_cost - 1) if unsettled_cost > 0 else 0
 
-                # 9. 计算单币亏损超过95%的数量
-                severe_loss_count = len([r for r in losses if r.get('roi', 0) <= -0.95])
+                # 9. 单币亏损超过95%的数量（评分时已统计）
+                severe_loss_count = profit_dim.get("severe_loss_count", 0)
                 
                 # 10. 计算亏损代币数量
-                loss_count = len(losses)
+                loss_count = len(results) - win_count
                 
                 # 11. 计算去掉最高收益代币后的整体ROI
                 # profit_dim 中已经有 profit_pct_excluding_max（百分比），需要转换为ROI格式
                 profit_pct_excluding_max = profit_dim.get("profit_pct_excluding_max", 0)
                 roi_excluding_max = profit_pct_excluding_max / 100  # 转换为小数形式（如 0.5 表示 50%）
 
-                # 12. 计算平均每次买入的SOL数量
-                # 从所有交易的 buy_sol 中提取，计算平均值
-                all_buy_amounts = []
-                for r in results:
-                    transactions = r.get("transactions", [])
-                    for tx in transactions:
-                        buy_sol = tx.get("buy_sol", 0)
-                        if buy_sol > 1e-9:  # 只统计有效的买入金额
-                            all_buy_amounts.append(buy_sol)
-                avg_buy_sol = sum(all_buy_amounts) / len(all_buy_amounts) if all_buy_amounts else 0
-
-                # 13. 计算已清仓代币的平均买入次数和卖出次数
-                # 只统计 remaining_tokens == 0 的代币（已完全清仓）
-                settled_tokens = [r for r in results if not r.get('is_unsettled', False) and r.get('remaining_tokens', 0) == 0]
-                if settled_tokens:
-                    avg_buy_count = sum(r.get('buy_count', 0) for r in settled_tokens) / len(settled_tokens)
-                    avg_sell_count = sum(r.get('sell_count', 0) for r in settled_tokens) / len(settled_tokens)
+                # 12. 平均每次买入的SOL数量（步骤8中已累计）
+                avg_buy_sol = buy_sol_sum / buy_sol_n if buy_sol_n else 0
+
+                # 13. 已清仓代币的平均买入次数和卖出次数（步骤8中已累计）
+                if settled_n:
+                    avg_buy_count = settled_buy_sum / settled_n
+                    avg_sell_count = settled_sell_sum / settled_n
                 else:
                     avg_buy_count = 0
                     avg_sell_count = 0
 
-                pbar.update(1)
-                return {
-                    "钱包地址": address,
-                    "综合评分": scores["final_score"],
-                    "战力评级": scores["tier"],
-                    "最佳定位": best_role,
-                    "定位评分": best_role_score,
-                    "垃圾地址": is_trash,
-                    "垃圾地址原因": trash_reasons_str,
-                    "盈利力评分": profit_dim.get("score", 0),
-                    "持久力评分": persistence_dim.get("score", 0),
-                    "真实性评分": authenticity_dim.get("score", 0),
-                    "盈亏比": round(profit_dim.get("profit_factor", 0), 2),
-                    "胜率": round(win_rate, 3),
-                    "总盈亏(SOL)": round(total_profit, 2),
-                    "30天盈利(SOL)": round(profit_dim.get("profit_30d", 0), 2),
-                    "30天盈利(%)": round(profit_dim.get("profit_pct_30d", 0), 2),
-                    "7天盈利(SOL)": round(profit_dim.get("profit_7d", 0), 2),
-                    "7天盈利(%)": round(profit_dim.get("profit_pct_7d", 0), 2),
-                    "最大单笔ROI": f"{max_roi:.0%}",
-                    "最大单笔亏损": f"{profit_dim.get('max_single_loss', 0):.1%}",
-                    "平均持仓(分钟)": round(authenticity_dim.get("avg_hold_time", 0), 1),
-                    "盈利持仓(分钟)": round(authenticity_dim.get("avg_win_hold_time", 0), 1),
-                    "亏损持仓(分钟)": round(authenticity_dim.get("avg_loss_hold_time", 0), 1),
-                    "代币多样性": authenticity_dim.get("unique_tokens", 0),
-                    "30天代币数": persistence_dim.get("tokens_30d", 0),
-                    "30天交易数": persistence_dim.get("tx_count_30d", 0),
-                    "7天代币数": persistence_dim.get("tokens_7d", 0),
-                    "7天交易数": persistence_dim.get("tx_count_7d", 0),
-                    "项目总数": len(results),
-                    "亏损代币数量": loss_count,
-                    "未结算token数": unsettled_count,
-                    "未结算盈利(SOL)": round(unsettled_profit, 2),
-                    "未结算ROI": f"{unsettled_roi:.1%}",
-                    "未结算平均持仓(分钟)": round(unsettled_avg_hold_time, 1),
-                    "单币亏损>95%数量": severe_loss_count,
-                    "去掉最高收益后整体ROI": roi_excluding_max,
-                    "平均每次买入(SOL)": round(avg_buy_sol, 3),
-                    "已清仓代币平均买入次数": round(avg_buy_count, 2),
-                    "已清仓代币平均卖出次数": round(avg_sell_count, 2),
-                    "分析时间": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                    "🛡️ 稳健中军": positioning.get("🛡️ 稳健中军", 0),
-                    "⚔️ 土狗猎手": positioning.get("⚔️ 土狗猎手", 0),
-                    "💎 钻石之手": positioning.get("💎 钻石之手", 0),
-                    "🚀 短线高手": positioning.get("🚀 短线高手", 0),
-                }
+                # 按 REPORT_COLUMNS 顺序返回一行（元组），导出时直接按列名构建 DataFrame，无需逐行按键查找
+                # 这里只放原始数值，保留小数位和百分比格式化在导出时按列统一处理（见 REPORT_ROUND_DIGITS）
+                return (
+                    address,  # 钱包地址
+                    scores["final_score"],  # 综合评分
+                    scores["tier"],  # 战力评级
+                    best_role,  # 最佳定位
+                    best_role_score,  # 定位评分
+                    is_trash,  # 垃圾地址
+                    trash_reasons_str,  # 垃圾地址原因
+                    profit_dim.get("score", 0),  # 盈利力评分
+                    persistence_dim.get("score", 0),  # 持久力评分
+                    authenticity_dim.get("score", 0),  # 真实性评分
+                    profit_dim.get("profit_factor", 0),  # 盈亏比
+                    win_rate,  # 胜率
+                    total_profit,  # 总盈亏(SOL)
+                    profit_dim.get("profit_30d", 0),  # 30天盈利(SOL)
+                    profit_dim.get("profit_pct_30d", 0),  # 30天盈利(%)
+                    profit_dim.get("profit_7d", 0),  # 7天盈利(SOL)
+                    profit_dim.get("profit_pct_7d", 0),  # 7天盈利(%)
+                    max_roi,  # 最大单笔ROI
+                    profit_dim.get("max_single_loss", 0),  # 最大单笔亏损
+                    authenticity_dim.get("avg_hold_time", 0),  # 平均持仓(分钟)
+                    authenticity_dim.get("avg_win_hold_time", 0),  # 盈利持仓(分钟)
+                    authenticity_dim.get("avg_loss_hold_time", 0),  # 亏损持仓(分钟)
+                    authenticity_dim.get("unique_tokens", 0),  # 代币多样性
+                    persistence_dim.get("tokens_30d", 0),  # 30天代币数
+                    persistence_dim.get("tx_count_30d", 0),  # 30天交易数
+                    persistence_dim.get("tokens_7d", 0),  # 7天代币数
+                    persistence_dim.get("tx_count_7d", 0),  # 7天交易数
+                    len(results),  # 项目总数
+                    loss_count,  # 亏损代币数量
+                    unsettled_count,  # 未结算token数
+                    unsettled_profit,  # 未结算盈利(SOL)
+                    unsettled_roi,  # 未结算ROI
+                    unsettled_avg_hold_time,  # 未结算平均持仓(分钟)
+                    severe_loss_count,  # 单币亏损>95%数量
+                    roi_excluding_max,  # 去掉最高收益后整体ROI
+                    avg_buy_sol,  # 平均每次买入(SOL)
+                    avg_buy_count,  # 已清仓代币平均买入次数
+                    avg_sell_count,  # 已清仓代币平均卖出次数
+                    positioning[ROLE_STABLE],
+                    positioning[ROLE_HUNTER],
+                    positioning[ROLE_DIAMOND],
+                    positioning[ROLE_SHORT_TERM],
+                    analysis_time or datetime.now().strftime("%Y-%m-%d %H:%M"),  # 分析时间
+                )
 
         except Exception as e:
             logger.error(f"分析钱包 {address[:8]}... 时出错: {e}", exc_info=True)
-            pbar.update(1)
             return None
 
     async def analyze_batch(
@@ -593,146 +711,121 @@ class BatchAnalyzerV2:
             addresses: List[str],
             max_txs: int = 5000,
             save_interval: int = 20,
-            exporter: 'ReportExporterV2' = None
-    ) -> List[Dict]:
+            progress_log_file: Optional[str] = None
+    ) -> List[Tuple]:
         """
         批量分析钱包列表（生产者-消费者模式）
         
         设计：
-        - 所有任务并发创建（生产者）
+        - 地址放入队列（生产者），固定数量的工作协程循环取地址分析（消费者）
         - API调用允许N个Key并行（N=key数量），但同一Key内部串行
         - 数据处理并发（通过data_processing_semaphore）
-        - 每处理N个钱包自动保存一次报告
+        - 每个成功结果立即追加写入结果日志（只追加一行，不重写已有结果），每N个结果刷新一次到磁盘
         
         Args:
             addresses: 钱包地址列表
             max_txs: 每个钱包最大交易数量（默认5000，降低以提升速度）
-            save_interval: 每处理多少个钱包保存一次报告（默认20）
-            exporter: 报告导出器实例（用于定期保存）
+            save_interval: 每成功分析多少个钱包把结果日志刷新到磁盘一次（默认20）
+            progress_log_file: 结果日志路径（为 None 时按当前时间戳生成）
             
         Returns:
             分析结果列表
         """
         pbar = tqdm(total=len(addresses), desc="📊 审计进度", unit="钱包", colour="green")
+        analysis_time = datetime.now().strftime("%Y-%m-%d %H:%M")  # 整批共用同一个分析时间，不在每个钱包上重复格式化
 
         helius_key_count = len(self.helius_key_manager.key_list)
         jupiter_key_count = len(self.jupiter_key_manager.key_list)
         logger.info(
             f"开始分析 {len(addresses)} 个钱包（Helius {helius_key_count}个Key并行，Jupiter {jupiter_key_count}个Key并行，数据处理并发{self.concurrent_limit}）...")
-        logger.info(f"每成功分析 {save_interval} 个钱包自动保存一次报告（只统计成功的）")
+        if progress_log_file is None:
+            progress_log_file = PROGRESS_LOG_TEMPLATE.format(datetime.now().strftime("%Y%m%d_%H%M%S"))
+        logger.info(f"结果逐行追加到 {progress_log_file}，每成功分析 {save_interval} 个钱包刷新一次（只统计成功的）")
 
-        # 共享的结果列表和计数器（用于定期保存）
-        all_results: List[Dict] = []
+        # 共享的结果列表和计数器
+        all_results: List[Tuple] = []
+        processed_count = 0  # 已处理的钱包数（含失败/过滤），由进度条刷新任务读取
         completed_count = 0  # 成功分析的钱包数（只统计成功的）
-        results_lock = asyncio.Lock()
-        save_lock = asyncio.Lock()  # 保存操作的锁，确保同时只有一个保存任务
-        save_tasks: List[asyncio.Task] = []  # 所有保存任务列表
-
-        # 确保 exporter 在闭包中可用
-        if exporter is None:
-            logger.warning("⚠️ exporter 为 None，中间报告保存功能将被禁用")
 
-        async def save_report_async(results_to_save: List[Dict], count: int):
-            """
-            异步保存报告（不阻塞主流程）
-            
-            Args:
-                results_to_save: 要保存的结果列表（复制一份避免并发修改）
-                count: 当前完成数量
-            """
-            async with save_lock:
-                try:
-                    # 检查 exporter 是否存在
-                    if exporter is None:
-                        logger.error(f"❌ exporter 为 None，无法保存 ({count} 个钱包)")
-                        return
-
-                    # 直接调用 export 方法（不使用 run_in_executor，避免问题）
-                    # 因为 pandas 操作很快，不需要放到线程池
-                    try:
-                        temp_file = exporter.export(
-                            results_to_save.copy(),  # 复制一份避免并发修改
-                            RESULTS_DIR,
-                            True  # is_temp=True
-                        )
-                        if temp_file:
-                            abs_path = os.path.abspath(temp_file)
-                            # 检查文件是否真的存在
-                            if not os.path.exists(temp_file):
-                                logger.error(f"❌ 文件保存失败: 文件不存在 {abs_path}")
-                        else:
-                            logger.warning(f"⚠️ 保存中间报告返回 None ({count} 个钱包)")
-                    except Exception as export_error:
-                        logger.error(f"❌ 调用 exporter.export 失败 ({count} 个钱包): {export_error}", exc_info=True)
-                        raise
-                except Exception as e:
-                    logger.error(f"❌ 保存中间报告失败 ({count} 个钱包): {e}", exc_info=True)
+        # 追加式结果日志：中途中断时已完成的结果不会丢失，且每次只写新增的一行
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        progress_file = open(progress_log_file, 'w', encoding='utf-8-sig', newline='')
+        progress_writer = csv.writer(progress_file)
+        progress_writer.writerow(REPORT_COLUMNS)
 
-        async def analyze_task(session, addr, index):
+        async def analyze_task(session, addr):
             """
-            单个钱包分析任务（生产者）
-            内部会通过锁控制API调用（每个Key独立锁），数据处理并发
+            单个钱包分析任务
+            内部通过 Key 池控制API调用（同一Key串行），数据处理并发
             """
-            nonlocal completed_count, save_tasks
+            nonlocal completed_count, processed_count
             try:
-                result = await self.analyze_one_wallet(session, addr, pbar, max_txs)
+                result = await self.analyze_one_wallet(session, addr, max_txs, analysis_time)
 
                 if result is not None:
-                    should_save = False
-                    current_count = 0
-                    async with results_lock:
-                        all_results.append(result)
-                        completed_count += 1  # 只统计成功的
-                        current_count = completed_count  # 保存当前值，用于日志
-
-                        # 每成功分析N个钱包保存一次报告（异步，不阻塞）
-                        if completed_count % save_interval == 0:
-                            if exporter:
-                                should_save = True
-                            else:
-                                logger.warning(
-                                    f"⚠️ exporter 为 None，无法保存中间报告 (成功分析 {completed_count} 个钱包)")
-
-                    # 异步保存（不阻塞主流程）
-                    if should_save:
-                        logger.info(f"🔄 创建保存任务: 成功分析 {current_count} 个钱包，结果数: {len(all_results)}")
-                        # 创建异步保存任务（不等待完成）
-                        try:
-                            task = asyncio.create_task(
-                                save_report_async(all_results.copy(), current_count)
-                            )
-                            save_tasks.append(task)
-                        except Exception as task_error:
-                            logger.error(f"❌ 创建保存任务失败: {task_error}", exc_info=True)
+                    # 以下操作之间没有 await，在单线程事件循环中不会交错，无需加锁
+                    all_results.append(result)
+                    progress_writer.writerow(result)
+                    completed_count += 1  # 只统计成功的
+                    if completed_count % save_interval == 0:
+                        progress_file.flush()
+                        logger.info(f"🔄 已成功分析 {completed_count} 个钱包，结果日志已刷新到磁盘")
 
                 return result
             except Exception as e:
                 logger.error(f"处理钱包 {addr[:8]}... 时出错: {e}")
-                pbar.update(1)
                 return None
+            finally:
+                processed_count += 1
 
-        # 创建所有任务并发执行（生产者模式）
-        # API调用会在内部通过每个Key的独立锁控制（允许N个Key并行，N=key数量）
-        # 数据处理可以通过data_processing_semaphore并发
-        async with aiohttp.ClientSession() as session:
-            tasks = [analyze_task(session, addr, i) for i, addr in enumerate(addresses)]
-            raw_results = await asyncio.gather(*tasks, return_exceptions=True)
-            # 过滤掉异常和None（结果已经在analyze_task中添加到all_results）
-            exception_count = 0
-            for r in raw_results:
-                if isinstance(r, Exception):
-                    exception_count += 1
-                    if exception_count <= 5:  # 只记录前5个异常
-                        logger.error(f"任务执行异常: {r}")
-            if exception_count > 5:
-                logger.warning(f"还有 {exception_count - 5} 个异常未显示")
-
-        # 等待所有保存任务完成
-        if save_tasks:
-            logger.info(f"等待 {len(save_tasks)} 个保存任务完成...")
-            await asyncio.gather(*save_tasks, return_exceptions=True)
-            logger.info("所有保存任务已完成")
+        async def refresh_progress():
+            """
+            定时刷新进度条（单个后台任务统一写终端，避免每个任务各自 update 争用 tqdm 内部锁）
+            """
+            while True:
+                if pbar.n != processed_count:
+                    pbar.n = processed_count
+                    pbar.refresh()
+                await asyncio.sleep(PROGRESS_REFRESH_INTERVAL)
+
+        # 地址队列（生产者）：一次性放入全部地址
+        queue: asyncio.Queue = asyncio.Queue()
+        for addr in addresses:
+            queue.put_nowait(addr)
+
+        async def worker(session):
+            """
+            工作协程（消费者）：循环从队列取地址分析，直到队列取空
+            """
+            while True:
+                try:
+                    addr = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await analyze_task(session, addr)
 
+        # 固定数量的工作协程（而不是为每个地址各创建一个协程），协程数与地址数无关
+        # API调用会在内部通过 Key 池控制（允许N个Key并行，N=key数量，同一Key串行）
+        # 数据处理可以通过data_processing_semaphore并发
+        worker_count = min(len(addresses), max(helius_key_count * BATCH_WORKERS_PER_KEY, self.concurrent_limit))
+        # 优先复用 async with 进入时创建的共享会话，否则本次批量临时创建
+        session = self._session
+        owns_session = session is None
+        if owns_session:
+            session = create_http_session()
+        progress_task = asyncio.create_task(refresh_progress())
+        try:
+            # analyze_task 内部已捕获并记录所有异常，工作协程不会因单个钱包失败而退出
+            await asyncio.gather(*(worker(session) for _ in range(worker_count)))
+        finally:
+            progress_task.cancel()
+            # 等待刷新任务真正退出，避免其在 pbar.close() 之后再刷新进度条
+            await asyncio.gather(progress_task, return_exceptions=True)
+            progress_file.close()
+            if owns_session:
+                await session.close()
+
+        pbar.n = processed_count
         pbar.close()
         return all_results
 
@@ -743,17 +836,22 @@ class ReportExporterV2:
     """
 
     @staticmethod
-    def export(results: List[Dict], output_dir: str = RESULTS_DIR, is_temp: bool = False) -> Optional[str]:
+    def export(
+            results: List[Tuple],
+            output_dir: str = RESULTS_DIR,
+            excel: bool = False
+    ) -> Optional[Tuple[str, Optional[str]]]:
         """
-        导出分析结果到 Excel
+        导出分析结果：总是先写列式检查点（Parquet，未安装 pyarrow 时为 CSV，保存未经格式化的原始数值），
+        行数不超过 EXCEL_MAX_ROWS 或显式要求时再生成 Excel（按报告格式保留小数位、百分比显示）
         
         Args:
-            results: 分析结果列表
+            results: 分析结果列表（每项为按 REPORT_COLUMNS 顺序的元组）
             output_dir: 输出目录
-            is_temp: 是否为临时文件（True则覆盖临时文件，False则创建新文件）
+            excel: 是否强制生成 Excel（忽略 EXCEL_MAX_ROWS 限制）
             
         Returns:
-            输出文件路径，如果失败则返回 None
+            (检查点文件路径, Excel 文件路径)，未生成 Excel 时后者为 None；如果失败则返回 None
         """
         if not results:
             logger.warning(f"没有结果可导出 (results为空，长度: {len(results) if results else 0})")
@@ -763,57 +861,116 @@ class ReportExporterV2:
         os.makedirs(output_dir, exist_ok=True)
 
         try:
-            # 按综合评分排序
-            df = pd.DataFrame(results).sort_values(by="综合评分", ascending=False)
-
-            # 重新排列列的顺序，让重要信息在前面
-            important_cols = [
-                "钱包地址", "综合评分", "战力评级", "最佳定位", "定位评分",
-                "垃圾地址", "垃圾地址原因",
-                "盈利力评分", "持久力评分", "真实性评分",
-                "盈亏比", "胜率", "总盈亏(SOL)", "30天盈利(SOL)", "30天盈利(%)",
-                "7天盈利(SOL)", "7天盈利(%)", "最大单笔ROI", "最大单笔亏损",
-                "平均持仓(分钟)", "盈利持仓(分钟)", "亏损持仓(分钟)",
-                "代币多样性", "30天代币数", "30天交易数", "7天代币数", "7天交易数",
-                "项目总数", "亏损代币数量", "未结算token数", "未结算盈利(SOL)", "未结算ROI", "未结算平均持仓(分钟)",
-                "单币亏损>95%数量", "去掉最高收益后整体ROI",
-                "平均每次买入(SOL)", "已清仓代币平均买入次数", "已清仓代币平均卖出次数",
-                "🛡️ 稳健中军", "⚔️ 土狗猎手", "💎 钻石之手", "🚀 短线高手",
-                "分析时间"
-            ]
-
-            # 确保所有列都存在
-            available_cols = [col for col in important_cols if col in df.columns]
-            remaining_cols = [col for col in df.columns if col not in available_cols]
-            df = df[available_cols + remaining_cols]
-
-            if is_temp:
-                # 临时文件：覆盖同一个文件
-                output_file = os.path.join(output_dir, "wallet_ranking_v2_temp.xlsx")
+            # 结果元组已按报告列顺序排列，直接按位构建并按综合评分排序
+            df = pd.DataFrame.from_records(results, columns=REPORT_COLUMNS).sort_values(by="综合评分", ascending=False)
+
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            base_path = os.path.join(output_dir, f"wallet_ranking_v2_{timestamp}")
+
+            # 检查点文件（写入快、体积小，可作为重跑的数据来源），写入未经四舍五入和百分比格式化的原始数值
+            checkpoint_file = ReportExporterV2._write_checkpoint(df, base_path)
+            logger.info(f"已写入检查点: {os.path.abspath(checkpoint_file)}")
+
+            # Excel 的 XML 序列化很慢，结果过多时只保留检查点
+            excel_file = None
+            if excel or len(df) <= EXCEL_MAX_ROWS:
+                # 只对 Excel 按列统一处理小数位和百分比格式（不在每个钱包的分析路径上逐个格式化）
+                report_df = df.round(REPORT_ROUND_DIGITS)
+                for col, digits in REPORT_PERCENT_DIGITS.items():
+                    report_df[col] = report_df[col].map(f"{{:.{digits}%}}".format)
+                excel_file = base_path + ".xlsx"
+                ReportExporterV2._write_excel(report_df, excel_file)
             else:
-                # 最终文件：创建新文件
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                output_file = os.path.join(output_dir, f"wallet_ranking_v2_{timestamp}.xlsx")
-
-            df.to_excel(output_file, index=False, engine='openpyxl')
-            abs_path = os.path.abspath(output_file)
+                logger.info(f"结果共 {len(df)} 行，超过 {EXCEL_MAX_ROWS} 行，跳过 Excel 生成（可用 --excel 强制生成）")
 
             # 验证文件是否真的创建成功
-            if os.path.exists(output_file):
+            for output_file in filter(None, (checkpoint_file, excel_file)):
+                abs_path = os.path.abspath(output_file)
+                if not os.path.exists(output_file):
+                    logger.error(f"❌ 文件保存失败: 文件不存在 {abs_path}")
+                    return None
                 file_size = os.path.getsize(output_file)
                 logger.info(f"✅ 导出成功: {abs_path} ({len(results)} 条记录，文件大小: {file_size} 字节)")
-            else:
-                logger.error(f"❌ 文件保存失败: 文件不存在 {abs_path}")
-                return None
 
-            return output_file
+            return checkpoint_file, excel_file
         except Exception as e:
             logger.error(f"导出失败: {e}")
             return None
 
+    @staticmethod
+    def _write_checkpoint(df: pd.DataFrame, base_path: str) -> str:
+        """
+        写入列式检查点文件（安装了 pyarrow 时为 zstd 压缩的 Parquet，否则回退到 CSV）
+        
+        Args:
+            df: 报告数据
+            base_path: 不含扩展名的输出路径
+            
+        Returns:
+            检查点文件路径
+        """
+        if pyarrow is not None:
+            checkpoint_file = base_path + ".parquet"
+            df.to_parquet(checkpoint_file, engine='pyarrow', compression='zstd', index=False)
+        else:
+            checkpoint_file = base_path + ".csv"
+            df.to_csv(checkpoint_file, index=False, encoding='utf-8-sig')
+        return checkpoint_file
 
-async def main():
-    """主函数：批量分析入口"""
+    @staticmethod
+    def _write_excel(df: pd.DataFrame, output_file: str):
+        """
+        将报告写入 Excel 文件
+        
+        优先使用 xlsxwriter 的 constant_memory 模式逐行写入（写完一行即落盘，内存只保留当前行）；
+        pandas 的 to_excel 按列输出单元格，与 constant_memory 不兼容，因此这里直接按行写。
+        未安装 xlsxwriter 时回退到 openpyxl 的 write_only 工作簿（同样逐行追加，不构建完整的单元格对象）
+        
+        Args:
+            df: 报告数据
+            output_file: 输出文件路径
+        """
+        # astype(object) 将 numpy 标量转换为 Python 原生类型；缺失值写为空单元格（与 to_excel 一致）
+        rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+        if xlsxwriter is None:
+            from openpyxl import Workbook
+            from openpyxl.utils import get_column_letter
+
+            workbook = Workbook(write_only=True)
+            worksheet = workbook.create_sheet('Sheet1')
+            worksheet.freeze_panes = 'A2'
+            if "钱包地址" in df.columns:
+                address_letter = get_column_letter(df.columns.get_loc("钱包地址") + 1)
+                worksheet.column_dimensions[address_letter].width = REPORT_ADDRESS_COL_WIDTH
+            worksheet.append(list(df.columns))
+            for row in rows:
+                worksheet.append(row)
+            workbook.save(output_file)
+            return
+
+        workbook = xlsxwriter.Workbook(output_file, {'constant_memory': True, 'nan_inf_to_errors': True})
+        try:
+            worksheet = workbook.add_worksheet('Sheet1')
+            worksheet.freeze_panes(1, 0)
+            if "钱包地址" in df.columns:
+                address_col = df.columns.get_loc("钱包地址")
+                worksheet.set_column(address_col, address_col, REPORT_ADDRESS_COL_WIDTH)
+
+            worksheet.write_row(0, 0, list(df.columns))
+            for row_idx, row in enumerate(rows, start=1):
+                worksheet.write_row(row_idx, 0, row)
+        finally:
+            workbook.close()
+
+
+async def main(excel: bool = False):
+    """
+    主函数：批量分析入口
+    
+    Args:
+        excel: 是否强制生成 Excel 报告（忽略 EXCEL_MAX_ROWS 限制）
+    """
     # 检查 API Key 配置
     helius_keys = [k for k in HELIUS_KEY_LIST if k and k.strip()]
     jupiter_keys = [k for k in JUPITER_KEY_LIST if k and k.strip()]
@@ -856,8 +1013,8 @@ async def main():
         print("❌ 未找到钱包地址列表")
         return
 
-    # 过滤黑名单
-    addresses = [a for a in all_addresses if not trash_manager.contains(a)]
+    # 过滤黑名单（all_addresses 保持完整，结束时原样写回钱包列表文件）
+    addresses = [a for a in all_addresses if a not in trash_set]
     skip_count = len(all_addresses) - len(addresses)
 
     if not addresses:
@@ -866,56 +1023,54 @@ async def main():
 
     print(f"🚀 启动批量分析 V2 (超严格版) | 任务数: {len(addresses)} (跳过黑名单: {skip_count})")
 
-    # 执行批量分析（每20个钱包自动保存一次）
-    results = await batch_analyzer.analyze_batch(addresses, max_txs=MAX_TXS, save_interval=20, exporter=exporter)
-
-    # 导出最终结果（覆盖临时文件或创建新文件）
+    # 执行批量分析（结果逐行追加到本次运行单独的结果日志，每20个钱包刷新一次）
+    progress_log_file = PROGRESS_LOG_TEMPLATE.format(datetime.now().strftime("%Y%m%d_%H%M%S"))
+    try:
+        async with batch_analyzer:
+            results = await batch_analyzer.analyze_batch(
+                addresses, max_txs=MAX_TXS, save_interval=20, progress_log_file=progress_log_file)
+    finally:
+        # 写入缓冲中的黑名单地址
+        trash_manager.flush()
+
+    # 导出最终结果
     if results:
-        # 删除临时文件（如果存在）
-        temp_file = os.path.join(RESULTS_DIR, "wallet_ranking_v2_temp.xlsx")
-        if os.path.exists(temp_file):
+        # 导出最终报告（放到线程池执行，写 Excel 期间不阻塞事件循环）
+        loop = asyncio.get_running_loop()
+        exported = await loop.run_in_executor(None, exporter.export, results, RESULTS_DIR, excel)
+        if exported:
+            checkpoint_file, excel_file = exported
+            # 最终报告已包含全部结果，追加式结果日志不再需要
             try:
-                os.remove(temp_file)
-                logger.debug(f"已删除临时文件: {temp_file}")
-            except Exception as e:
-                logger.warning(f"删除临时文件失败: {e}")
-
-        # 导出最终报告
-        output_file = exporter.export(results, is_temp=False)
-        if output_file:
-            print(f"\n✅ 导出成功: {output_file}")
+                os.remove(progress_log_file)
+            except OSError as e:
+                logger.warning(f"删除结果日志失败: {e}")
+            print(f"\n✅ 检查点: {checkpoint_file}")
+            if excel_file:
+                print(f"✅ Excel 报告: {excel_file}")
+            else:
+                print(f"ℹ️ 结果超过 {EXCEL_MAX_ROWS} 行，未生成 Excel（可加 --excel 强制生成）")
             print(f"📊 共分析 {len(results)} 个钱包，已按综合评分排序")
 
             # 显示前5名
             if len(results) > 0:
                 print("\n🏆 Top 5 钱包:")
+                col = REPORT_COLUMN_INDEX
                 for i, r in enumerate(results[:5], 1):
                     print(
-                        f"  {i}. {r['钱包地址'][:8]}... | 评分: {r['综合评分']} | 评级: {r['战力评级']} | 定位: {r['最佳定位']} | 30天盈利: {r['30天盈利(SOL)']:+.2f} SOL")
+                        f"  {i}. {r[col['钱包地址']][:8]}... | 评分: {r[col['综合评分']]} | 评级: {r[col['战力评级']]} | 定位: {r[col['最佳定位']]} | 30天盈利: {r[col['30天盈利(SOL)']]:+.2f} SOL")
         else:
             print("\n⚠️ 导出失败")
     else:
         print("\n🏁 分析结果为空，请检查报错或地址列表。")
 
-    # 收集所有有效的钱包地址（从分析结果和原始列表中提取）
-    valid_addresses = set()
+    # 收集所有有效的钱包地址：分析结果中的地址都来自原始列表，
+    # 而原始列表在加载时已去重并校验格式，因此直接使用即可，无需再次校验
+    valid_addresses = set(all_addresses)
 
-    # 1. 从分析结果中提取（这些是成功分析的钱包）
-    if results:
-        for r in results:
-            addr = r.get('钱包地址', '').strip()
-            if addr and is_valid_solana_address(addr):
-                valid_addresses.add(addr)
-
-    # 2. 从原始列表中提取（包括未分析但格式正确的地址）
-    for addr in all_addresses:
-        addr = addr.strip()
-        if addr and is_valid_solana_address(addr):
-            valid_addresses.add(addr)
-
-    # 3. 保存有效的钱包地址回文件
+    # 保存有效的钱包地址回文件
     if valid_addresses:
-        saved = WalletListSaver.save_valid_addresses(list(valid_addresses), WALLETS_FILE)
+        saved = WalletListSaver.save_valid_addresses(list(valid_addresses), WALLETS_FILE, skip_validation=True)
         if saved:
             print(f"\n✅ 已过滤并保存 {len(valid_addresses)} 个有效钱包地址到 {WALLETS_FILE}")
         else:
@@ -925,4 +1080,10 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="批量钱包分析工具 V2")
+    parser.add_argument(
+        "--excel", action="store_true",
+        help=f"无论结果行数多少都生成 Excel 报告（默认超过 {EXCEL_MAX_ROWS} 行时只写检查点，Excel 写入慢得多）")
+    args = parser.parse_args()
+    install_fast_event_loop()
+    asyncio.run(main(args.excel))
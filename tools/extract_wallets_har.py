@@ -2,38 +2,61 @@ import base64
 import json
 import re
 
+import orjson
+
+try:
+    import ijson  # 可选依赖：逐条流式解析 HAR，未安装时回退到整体 json.load
+except ImportError:
+    ijson = None
+
+BASE58_BYTES = b"123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"  # Base58 字符集（不含 0, O, I, l）
+URL_ADDRESS_RE = re.compile(r'/([1-9A-HJ-NP-Za-km-z]{32,44})(?:[/?]|$)')  # URL 路径中的地址段
+SYSTEM_ADDRESS = "So11111111111111111111111111111111111111111"  # 系统地址，不作为钱包
+
 
 def is_solana_address(address):
-    # Solana 地址长度通常在 32-44 位，使用 Base58 字符集
+    # Solana 地址长度通常在 32-44 位，使用 Base58 字符集（先做廉价的长度和等值判断，最后删除全部 Base58 字节，有剩余即非法）
     if not (32 <= len(address) <= 44):
         return False
-    if not re.match(r'^[1-9A-HJ-NP-Za-km-z]+$', address):
+    if address == SYSTEM_ADDRESS:
         return False
-    if address == "So11111111111111111111111111111111111111111":
-        return False
-    return True
+    return address.isascii() and not address.encode().translate(None, BASE58_BYTES)
 
 
 def extract_from_json(obj, found_addresses):
-    if isinstance(obj, str):
-        if is_solana_address(obj):
-            found_addresses.add(obj)
-    elif isinstance(obj, dict):
-        for v in obj.values():
-            extract_from_json(v, found_addresses)
-    elif isinstance(obj, list):
-        for item in obj:
-            extract_from_json(item, found_addresses)
+    # 用显式栈代替递归：不再为每个节点创建函数栈帧，深层嵌套的响应也不会触发递归上限
+    stack = [obj]
+    pop = stack.pop
+    extend = stack.extend
+    while stack:
+        node = pop()
+        if isinstance(node, str):
+            # 先做长度预筛，绝大多数非地址字符串不会进入字符集校验
+            if 32 <= len(node) <= 44 and is_solana_address(node):
+                found_addresses.add(node)
+        elif isinstance(node, dict):
+            extend(node.values())
+        elif isinstance(node, list):
+            extend(node)
+
+
+def iter_har_entries(har_file):
+    # 有 ijson 时逐条产出 entries，不必先把整个 HAR（常有数百 MB）解析进内存
+    if ijson is not None:
+        with open(har_file, 'rb') as f:
+            yield from ijson.items(f, 'log.entries.item')
+        return
+
+    with open(har_file, 'r', encoding='utf-8') as f:
+        har_data = json.load(f)
+    yield from har_data['log']['entries']
 
 
 def main():
     wallets = set()
     har_file = 'gmgn.ai.har'  # 请确保文件名正确
 
-    with open(har_file, 'r', encoding='utf-8') as f:
-        har_data = json.load(f)
-
-    for entry in har_data['log']['entries']:
+    for entry in iter_har_entries(har_file):
         content = entry['response'].get('content', {})
         text = content.get('text', '')
         encoding = content.get('encoding', '')
@@ -42,24 +65,31 @@ def main():
         if not text:
             continue
 
-        # 核心：处理 HAR 中的 Base64 编码内容
+        # 核心：处理 HAR 中的 Base64 编码内容（保留原始字节，orjson 可直接解析，无需先解码成 str）
         if encoding == 'base64':
             try:
-                text = base64.b64decode(text).decode('utf-8', errors='ignore')
+                text = base64.b64decode(text)
             except:
                 continue
 
         # 仅解析 JSON 响应，避开 JS/HTML 中的干扰
         if 'application/json' in mime_type:
             try:
-                data = json.loads(text)
+                data = orjson.loads(text)
+            except orjson.JSONDecodeError:
+                # orjson 拒绝非法 UTF-8，回退到忽略非法字节后再解析
+                try:
+                    if isinstance(text, bytes):
+                        text = text.decode('utf-8', errors='ignore')
+                    data = json.loads(text)
+                except:
+                    data = None
+            if data is not None:
                 extract_from_json(data, wallets)
-            except:
-                pass
 
         # 同时也检查请求的 URL（有时地址在 URL 路径中）
         url = entry['request']['url']
-        path_matches = re.findall(r'/([1-9A-HJ-NP-Za-km-z]{32,44})(?:[/?]|$)', url)
+        path_matches = URL_ADDRESS_RE.findall(url)
         for m in path_matches:
             if is_solana_address(m):
                 wallets.add(m)
@@ -9,10 +9,12 @@
               - 每天在对应的日期文件中记录日志
               - 跨天时自动切换到新的日志文件
 """
+import atexit
 import logging
 import os
-from datetime import datetime
-from logging.handlers import BaseRotatingHandler
+import queue
+from datetime import datetime, timedelta
+from logging.handlers import BaseRotatingHandler, QueueHandler, QueueListener
 
 
 class DailyRotatingFileHandler(BaseRotatingHandler):
@@ -38,6 +40,7 @@ class DailyRotatingFileHandler(BaseRotatingHandler):
         self.current_date = None
         self.current_file = None
         self.baseFilename = None
+        self.rollover_at = 0.0  # 下一个本地零点的时间戳，到达后切换文件
         
         # 确保日志目录存在
         if not os.path.exists(log_dir):
@@ -77,19 +80,15 @@ class DailyRotatingFileHandler(BaseRotatingHandler):
         self.current_date = today
         self.current_file = self._get_log_filename(datetime.now())
         self.baseFilename = self.current_file
+        # 预先算好次日零点（本地时间），shouldRollover 只需比较记录时间，不必每条日志构造 datetime
+        self.rollover_at = datetime.combine(today + timedelta(days=1), datetime.min.time()).timestamp()
         
-        # 如果之前有打开的文件，先关闭
+        # 如果之前有打开的文件，先关闭（新文件由 _open 以追加模式打开时创建）
         if old_file and old_file != self.current_file and self.stream:
             try:
                 self.stream.close()
             except Exception:
                 pass
-        
-        # 打开新文件
-        if not os.path.exists(self.current_file):
-            # 创建新文件
-            with open(self.current_file, 'a', encoding=self.encoding):
-                pass
     
     def _open(self):
         """
@@ -98,8 +97,7 @@ class DailyRotatingFileHandler(BaseRotatingHandler):
         Returns:
             文件对象
         """
-        # 每次打开前检查日期是否变化
-        self._update_file()
+        # 日期切换已由 __init__ / doRollover 中的 _update_file 完成，这里只负责打开
         return open(self.baseFilename, self.mode, encoding=self.encoding)
     
     def shouldRollover(self, record):
@@ -115,8 +113,7 @@ class DailyRotatingFileHandler(BaseRotatingHandler):
         if self.current_date is None:
             return True
         
-        today = datetime.now().date()
-        return today != self.current_date
+        return record.created >= self.rollover_at
     
     def doRollover(self):
         """
@@ -133,20 +130,48 @@ class DailyRotatingFileHandler(BaseRotatingHandler):
         
         # 重新打开文件流
         self.stream = self._open()
+
+
+class CachedTimeFormatter(logging.Formatter):
+    """
+    缓存时间字符串的日志格式化器
+    
+    datefmt 精确到秒（毫秒由 %(msecs)03d 单独输出），同一秒内的日志复用已格式化的时间，
+    只在秒数变化时才调用 strftime
+    """
     
-    def emit(self, record):
+    def __init__(self, fmt: str = None, datefmt: str = None):
         """
-        发送日志记录（重写以确保日期检查）
+        初始化格式化器
         
         Args:
-            record: 日志记录对象
+            fmt: 日志格式
+            datefmt: 时间格式（需精确到秒，不含毫秒）
+        """
+        super().__init__(fmt, datefmt)
+        self._time_cache = (None, "")  # (整数秒, 格式化后的时间)，整体替换保证多线程下读到一致的一对
+    
+    def formatTime(self, record, datefmt=None):
         """
-        # 在写入前检查日期是否变化
-        if self.shouldRollover(record):
-            self.doRollover()
+        格式化日志时间（同一秒内直接返回缓存）
         
-        # 调用父类的 emit 方法
-        super().emit(record)
+        Args:
+            record: 日志记录对象
+            datefmt: 时间格式
+            
+        Returns:
+            格式化后的时间字符串
+        """
+        # 未指定 datefmt 时默认格式带毫秒，不能按秒缓存
+        if not datefmt:
+            return super().formatTime(record, datefmt)
+        
+        second = int(record.created)
+        cached_second, cached_time = self._time_cache
+        if second != cached_second:
+            cached_time = super().formatTime(record, datefmt)
+            self._time_cache = (second, cached_time)
+        return cached_time
 
 
 def setup_logger(name="Bot"):
@@ -157,6 +182,7 @@ def setup_logger(name="Bot"):
     - 创建按日期轮转的文件处理器
     - 同时输出到文件和控制台
     - 支持跨天自动切换日志文件
+    - 文件和控制台写入由后台线程完成，调用方（包括异步事件循环）只需入队
     
     Args:
         name: 日志记录器名称，默认为 "Bot"
@@ -171,7 +197,7 @@ def setup_logger(name="Bot"):
     
     # 避免重复添加处理器
     if not logger.handlers:
-        formatter = logging.Formatter(
+        formatter = CachedTimeFormatter(
             '%(asctime)s.%(msecs)03d | %(levelname)s | %(message)s',
             datefmt='%H:%M:%S'
         )
@@ -179,12 +205,18 @@ def setup_logger(name="Bot"):
         # 文件输出（按日期轮转）
         fh = DailyRotatingFileHandler(log_dir, encoding='utf-8')
         fh.setFormatter(formatter)
-        logger.addHandler(fh)
         
         # 控制台输出
         ch = logging.StreamHandler()
         ch.setFormatter(formatter)
-        logger.addHandler(ch)
+        
+        # 记录器只挂 QueueHandler，实际的磁盘/控制台 IO 交给后台监听线程，避免阻塞调用方
+        log_queue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, fh, ch, respect_handler_level=True)
+        listener.start()
+        # 进程退出前停止监听线程，确保队列中剩余的日志写完
+        atexit.register(listener.stop)
+        logger.addHandler(QueueHandler(log_queue))
     
     return logger
 
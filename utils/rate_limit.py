@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File       : rate_limit.py
+@Description: 限流退避工具模块
+              - 计算被限流（429）后的等待时间
+              - 优先遵循 Retry-After，否则指数退避加随机抖动
+"""
+import random
+from typing import Optional
+
+RATE_LIMIT_MAX_WAIT = 60  # 被限流后单次退避的最长等待时间（秒），Retry-After 同样受此限制
+
+
+def rate_limit_delay(retry_after: Optional[str], retry_count: int) -> float:
+    """
+    计算被限流（429）后的等待时间
+    
+    优先遵循响应头 Retry-After（最多 RATE_LIMIT_MAX_WAIT 秒，避免服务端给出超长值时长时间占住工作协程）；
+    否则使用带随机抖动的指数退避（2、4、8... 秒乘以 0.5~1.5，最多 RATE_LIMIT_MAX_WAIT 秒），
+    避免并发分析的多个钱包在同一时刻集中重试
+    
+    Args:
+        retry_after: 响应头中的 Retry-After 值（可能为 None）
+        retry_count: 当前重试次数（从 1 开始）
+    
+    Returns:
+        等待秒数
+    """
+    if retry_after:
+        try:
+            return min(float(retry_after), RATE_LIMIT_MAX_WAIT)
+        except (ValueError, TypeError):
+            pass
+    return min(2 ** retry_count * random.uniform(0.5, 1.5), RATE_LIMIT_MAX_WAIT)